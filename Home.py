@@ -1,16 +1,35 @@
+from fbdl import startup
 import datetime
-import time
+import functools
 import logging
 import streamlit as st
 import os
-import yt_dlp
-import mimetypes
-from pathlib import Path
-import re
-from urllib.parse import urlparse, urlunparse
 import clipboard_component
-import zipfile
-import io
+from fbdl.config import (
+    DOWNLOAD_DIR, MAX_WORKERS, HOST_RATE, FILE_SERVER_HOST, FILE_SERVER_PORT, FILE_SERVER_URL,
+    CACHE_DB, CACHE_TTL, METADATA_TTL, STATE_DIR,
+    STORAGE_MAX_BYTES, STORAGE_MAX_AGE, STORAGE_MIN_FREE_BYTES, YDL_IDLE_TIMEOUT, YDL_MAX_USES,
+    RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, BREAKER_THRESHOLD, BREAKER_COOLDOWN, FASTSTART_WORKERS,
+    DEDUPE, BUNDLE_DIR,
+)
+from fbdl.blobstore import BlobStore
+from fbdl.cache import ResultCache, MetadataCache
+from fbdl.download_queue import DownloadQueue
+from fbdl.downloader import Downloader
+from fbdl.faststart import FaststartPool
+from fbdl.engine import DownloadEngine
+from fbdl.singleflight import SingleFlight
+from fbdl.storage import StorageManager
+from fbdl.formats import PRESETS
+from fbdl.metrics import stage
+from fbdl.progress import format_eta, format_rate, format_size
+from fbdl.queue_store import QueueStore
+from fbdl.retry import CircuitBreaker, RetryPolicy
+from fbdl.urls import ingest_urls
+from fbdl.ydl_pool import YDLPool
+from fbdl.zipstream import BundleRegistry
+
+startup.mark("imports")
 
 # -----------------------------
 # Initialize session state for urls and download status
@@ -18,105 +37,161 @@ import io
 if "urls_input" not in st.session_state:
     st.session_state["urls_input"] = ""
 if "download_queue" not in st.session_state:
-    st.session_state["download_queue"] = []
+    st.session_state["download_queue"] = DownloadQueue()
 if "is_processing" not in st.session_state:
     st.session_state["is_processing"] = False
-if "prepared_zip_data" not in st.session_state:
-    st.session_state["prepared_zip_data"] = None
-if "ready_to_download_files" not in st.session_state:
-    st.session_state["ready_to_download_files"] = {}
 
 logging.basicConfig(level=logging.ERROR)
 
 # -----------------------------
-# Setup download folder in Downloads
+# Shared download backend (one per server process)
 # -----------------------------
-downloads_path = Path.home() / "Downloads"
-DOWNLOAD_DIR = downloads_path
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+@st.cache_resource
+def get_downloader():
+    """Caches, single-flight registry, storage budget and YoutubeDL pool shared by every session.
 
-# -----------------------------
-# Logger for yt_dlp to suppress output
-# -----------------------------
-class MyLogger:
-    def debug(self, msg): pass
-    def warning(self, msg): pass
-    def error(self, msg): pass
+    yt_dlp is not imported here; a background thread loads it and readies a
+    pooled YoutubeDL while the first page paints.
+    """
+    downloader = Downloader(
+        DOWNLOAD_DIR,
+        ResultCache(CACHE_DB, ttl=CACHE_TTL),
+        MetadataCache(ttl=METADATA_TTL),
+        SingleFlight(),
+        StorageManager(
+            DOWNLOAD_DIR,
+            max_bytes=STORAGE_MAX_BYTES,
+            max_age=STORAGE_MAX_AGE,
+            min_free_bytes=STORAGE_MIN_FREE_BYTES,
+            link_dirs=[DOWNLOAD_DIR / ".blobs"] if DEDUPE else (),
+            extra_dirs=[BUNDLE_DIR],
+        ),
+        YDLPool(idle_timeout=YDL_IDLE_TIMEOUT, max_uses=YDL_MAX_USES),
+        FaststartPool(FASTSTART_WORKERS) if FASTSTART_WORKERS else None,
+        BlobStore(DOWNLOAD_DIR / ".blobs") if DEDUPE else None,
+    )
+    startup.prewarm_in_background(downloader)
+    return downloader
+
+download_video = get_downloader().download
 
 # -----------------------------
-# URL cleaning and validation
+# Shared download scheduler (one per server process, fair across sessions)
 # -----------------------------
-def clean_facebook_url(url: str) -> str:
-    """Cleans Facebook URL to its base form."""
-    parsed = urlparse(url.strip())
-    clean = parsed._replace(query="", fragment="")
-    return urlunparse(clean)
-
-#This now matches:
-
-#www.facebook.com
-#m.facebook.com
-#web.facebook.com
-#fb.watch/...
-
-def is_valid_facebook_video_url(url: str) -> bool:
-    """Validates if a URL is a known Facebook video or reel format."""
-    fb_video_pattern = re.compile(
-        r'^(https?://)?'                                # optional http/https
-        r'([a-z0-9-]+\.)?'                              # optional subdomain (www, m, web, l, etc.)
-        r'(facebook\.com|fb\.watch|fb\.me)/'            # main domains
-        r'('
-        r'[^ ]*/videos/\d+[^ ]*|'                       # /videos/123...
-        r'reel/\d+[^ ]*|'                               # /reel/123...
-        r'watch/\?v=\d+[^ ]*|'                          # /watch/?v=123...
-        r'story\.php\?story_fbid=\d+[^ ]*|'             # story.php?story_fbid=...
-        r'share/r/[A-Za-z0-9_-]+/?|'                    # /share/r/...
-        r'[A-Za-z0-9_-]+/?'                             # fb.watch/abc123 or fb.me/abc123
-        r')',
-        re.IGNORECASE
+@st.cache_resource
+def get_download_engine():
+    return DownloadEngine(
+        max_workers=MAX_WORKERS,
+        host_rate=HOST_RATE,
+        retry=RetryPolicy(RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY),
+        breaker=CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN),
     )
-    return bool(fb_video_pattern.match(url.strip()))
 
 # -----------------------------
-# Video download function
+# Persisted queue state (survives refreshes and worker restarts)
 # -----------------------------
-def download_video(video_url, progress_callback):
-    """Downloads a video and returns its local path."""
-    def progress_hook(d):
-        if d['status'] == 'downloading':
-            total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate')
-            downloaded_bytes = d.get('downloaded_bytes', 0)
-            if total_bytes:
-                progress = downloaded_bytes / total_bytes
-                progress_callback(progress)
-        elif d['status'] == 'finished':
-            progress_callback(1.0)
-
-    ydl_opts = {
-        'format': 'best',
-        'outtmpl': str(DOWNLOAD_DIR / '%(title).50s_%(id)s.%(ext)s'),
-        'quiet': True,
-        'no_warnings': True,
-        'progress_hooks': [progress_hook],
-        'logger': MyLogger(),
-    }
+@st.cache_resource
+def get_queue_store():
+    store = QueueStore(STATE_DIR)
+    store.prune()
+    return store
 
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=True)
-            file_path = ydl.prepare_filename(info)
+queue_store = get_queue_store()
+
+if "queue_token" not in st.session_state:
+    token = st.query_params.get("queue")
+    restored = queue_store.load(token) if token else None
+    if restored:
+        # The tab that owned this token may still have jobs queued in the engine (a
+        # refresh does not stop them); drop them so the restored items are not run twice
+        get_download_engine().cancel_session(token)
+        st.session_state["download_queue"] = restored
+        st.session_state["is_processing"] = restored.count("waiting") > 0
+        st.session_state["queue_token"] = token
+    else:
+        st.session_state["queue_token"] = QueueStore.new_token()
 
-        if not Path(file_path).suffix:
-            file_path = f"{file_path}.{info.get('ext', 'mp4')}"
+def persist_queue():
+    """Writes the queue to its state file whenever it changed since the last save."""
+    queue = st.session_state["download_queue"]
+    saved = st.session_state.get("saved_queue_revision")
+    if saved != (id(queue), queue.revision):
+        queue_store.save(st.session_state["queue_token"], queue)
+        st.session_state["saved_queue_revision"] = (id(queue), queue.revision)
 
-        return file_path
-    except Exception as e:
-        logging.error(f"Failed to download {video_url}: {e}")
-        return None
+def forget_queue():
+    get_download_engine().cancel_session(st.session_state["queue_token"])
+    queue_store.delete(st.session_state["queue_token"])
+    st.session_state["queue_token"] = QueueStore.new_token()
+    st.session_state.pop("saved_queue_revision", None)
+    st.query_params.pop("queue", None)
 
 # -----------------------------
-# Streamlit UI
+# "Download All" ZIP, built on disk as each download finishes
 # -----------------------------
+@st.cache_resource
+def get_bundles():
+    """One archive object per queue token for the whole process, plus the thread that fills them."""
+    return BundleRegistry(BUNDLE_DIR)
+
+def get_bundle():
+    """The session's archive; it follows the queue token, so a refreshed tab keeps it."""
+    return get_bundles().get(st.session_state["queue_token"])
+
+def discard_bundle():
+    token = st.session_state["queue_token"]
+    file_server = get_file_server()
+    if file_server:
+        file_server.unpublish(get_bundles().path(token))
+    get_bundles().discard(token)
+
+def download_and_bundle(url, progress_callback, bundles, bundle, **settings):
+    """download_video, then queues the file for the session's ZIP (copied off the download worker)."""
+    file_path = download_video(url, progress_callback, **settings)
+    bundles.append_later(bundle, file_path)
+    return file_path
+
+def read_file_bytes(path):
+    """Returns a zero-argument loader for download_button.
+
+    Nothing is read until the user clicks, but then the whole file is loaded
+    into memory (and Streamlit's media store). Only used when the file route
+    is off; large files and ZIPs should be streamed through get_file_server().
+    """
+    def load():
+        with stage("prepare"), open(path, "rb") as f:
+            return f.read()
+    return load
+
+@st.cache_resource
+def get_file_server():
+    """Range-capable file route, or None when FBDL_FILE_SERVER_URL is unset or the port is taken."""
+    fallback = "falling back to download_button, which reads each file fully into server memory"
+    if not (FILE_SERVER_URL and FILE_SERVER_PORT):
+        logging.warning(f"File route is off (FBDL_FILE_SERVER_URL or FBDL_FILE_SERVER_PORT unset); {fallback}")
+        return None
+    from fbdl.fileserver import FileServer
+    try:
+        return FileServer(FILE_SERVER_HOST, FILE_SERVER_PORT, FILE_SERVER_URL)
+    except OSError as e:
+        logging.error(f"File route could not listen on {FILE_SERVER_HOST}:{FILE_SERVER_PORT} ({e}); {fallback}")
+        return None
+
+def file_download_button(label, file_path, file_name, mime, key, **kwargs):
+    """Streams a file from disk through the file route; falls back to an in-memory download_button."""
+    file_server = get_file_server()
+    if file_server:
+        st.link_button(label, file_server.publish(file_path, file_name), **kwargs)
+    else:
+        st.download_button(
+            label=label,
+            data=read_file_bytes(file_path),
+            file_name=file_name,
+            mime=mime,
+            key=key,
+            **kwargs
+        )
+
 # -----------------------------
 # Streamlit UI
 # -----------------------------
@@ -136,17 +211,17 @@ st.markdown("Download Facebook videos and reels quickly and easily.")
 # -----------------------------
 if st.session_state.get("trigger_reset"):
     st.session_state["urls_input"] = ""
-    st.session_state["download_queue"] = []
+    st.session_state["download_queue"] = DownloadQueue()
     st.session_state["is_processing"] = False
-    st.session_state["prepared_zip_data"] = None
-    st.session_state["ready_to_download_files"] = {}
+    discard_bundle()
+    forget_queue()
     del st.session_state["trigger_reset"]
     st.rerun()
 
 if st.session_state.get("trigger_clear"):
-    st.session_state["download_queue"] = []
-    st.session_state["prepared_zip_data"] = None
-    st.session_state["ready_to_download_files"] = {}
+    st.session_state["download_queue"] = DownloadQueue()
+    discard_bundle()
+    forget_queue()
     del st.session_state["trigger_clear"]
     st.rerun()
 
@@ -163,22 +238,13 @@ clipboard_content = clipboard_component.paste_component(
 # Handle Clipboard Content
 # -----------------------------
 if clipboard_content:
-    potential_urls = re.split(r'[\s\n]+', clipboard_content.strip())
-    existing_links = set(
-        line.strip()
-        for line in st.session_state["urls_input"].splitlines()
-        if line.strip()
-    )
-    added_count = 0
-    for url in potential_urls:
-        url = clean_facebook_url(url)
-        if is_valid_facebook_video_url(url) and url not in existing_links:
-            if st.session_state["urls_input"]:
-                st.session_state["urls_input"] += "\n" + url
-            else:
-                st.session_state["urls_input"] = url
-            existing_links.add(url)
-            added_count += 1
+    existing_links = st.session_state["urls_input"].splitlines()
+    pasted = ingest_urls(clipboard_content, existing=existing_links)
+    added_count = len(pasted.accepted)
+    if added_count:
+        st.session_state["urls_input"] = "\n".join(
+            [line for line in existing_links if line.strip()] + pasted.accepted
+        )
 
     if added_count > 0:
         st.success(f"✅ Added {added_count} URL(s) from clipboard!")
@@ -194,194 +260,207 @@ urls_input = st.text_area(
     placeholder="https://www.facebook.com/reel/..."
 )
 
+# Quality selection (applies to the whole batch)
+q_col, size_col = st.columns([2, 1])
+with q_col:
+    quality = st.selectbox(
+        "Quality",
+        options=list(PRESETS),
+        format_func=lambda preset: PRESETS[preset][0],
+        key="quality",
+        disabled=st.session_state["is_processing"],
+        help="Lower presets download much less data."
+    )
+with size_col:
+    max_filesize_mb = st.number_input(
+        "Max file size (MB, 0 = no limit)",
+        min_value=0,
+        step=10,
+        key="max_filesize_mb",
+        disabled=st.session_state["is_processing"]
+    )
+
 # Start Processing Button
 if st.button("Start Processing", type="primary", use_container_width=True, disabled=st.session_state["is_processing"]):
     if not urls_input.strip():
         st.toast("⚠️ Please enter at least one URL!", icon="⚠️")
     else:
-        seen = set()
-        st.session_state["download_queue"] = []
-        
         # Simple validation toast
         st.toast("Processing URLs...", icon="⏳")
-        
-        count_added = 0
-        for u in urls_input.split("\n"):
-            u = u.strip()
-            if u:
-                u = clean_facebook_url(u)
-                if u not in seen:
-                    if is_valid_facebook_video_url(u):
-                        seen.add(u)
-                        st.session_state["download_queue"].append({"url": u, "status": "waiting", "file_path": None, "progress": 0})
-                        count_added += 1
-                    else:
-                        # Optional: could show warnings regarding skips
-                        pass
-        
+
+        ingested = ingest_urls(urls_input)
+        st.session_state["download_queue"] = DownloadQueue.from_urls(
+            ingested.accepted, quality=quality, max_filesize_mb=int(max_filesize_mb)
+        )
+        # A new batch starts a new archive
+        discard_bundle()
+        skipped_invalid = sum(1 for _, reason in ingested.rejected if reason == "invalid")
+        if skipped_invalid and ingested.accepted:
+            st.toast(f"Skipped {skipped_invalid} invalid URL(s).", icon="⚠️")
+
         if not st.session_state["download_queue"]:
             st.toast("No valid Facebook video URLs found!", icon="🚫")
         else:
             st.session_state["is_processing"] = True
+            # Lets a refreshed tab find this batch again
+            st.query_params["queue"] = st.session_state["queue_token"]
+            persist_queue()
             st.rerun()
 
 
 # --- Download Queue Display ---
-if st.session_state["download_queue"]:
-    st.subheader(f"Queue ({len(st.session_state['download_queue'])})")
-    
-    # Create placeholders for progress bars so they can be updated during download
-    progress_placeholders = {}
-
-    for idx, video in enumerate(st.session_state["download_queue"]):
-        status = video["status"]
-        
-        # Use a boxed container for each row
-        with st.container(border=True):
-            # Adjusted for better mobile visibility: Index(0.4), URL(3.0), Progress/Status(2.0), Save(1.2)
-            q_cols = st.columns([0.4, 3.0, 2.0, 1.2], vertical_alignment="center")
-            
-            with q_cols[0]:
-                st.markdown(f"**{idx+1}.**")
-                
-            with q_cols[1]:
-                # Aggressive truncation
-                display_url = video["url"]
-                if len(display_url) > 18:
-                    display_url = f"{display_url[:15]}..."
-                st.markdown(f"`{display_url}`", help=video["url"])
-                
-            with q_cols[2]:
-                # Dynamic area for status/progress
-                progress_placeholders[idx] = st.empty()
-                with progress_placeholders[idx]:
-                    if status == "waiting":
-                        st.caption("Waiting...")
-                    elif status == "downloading":
-                        st.progress(video.get("progress", 0.0))
-                    elif status == "success":
-                        st.markdown(":green[**Ready**]", help="Click to download.")
-                    elif status == "failed":
-                        st.markdown(":red[**Error**]", help="Check the URL and try again.")
-            
-            with q_cols[3]:
-                if status == "success":
-                    file_path = video["file_path"]
-                    if file_path and os.path.exists(file_path):
-                        # Check if this file is already prepared
-                        if idx in st.session_state["ready_to_download_files"]:
-                            # Show the actual download button
-                            file_data = st.session_state["ready_to_download_files"][idx]
-                            mime_type, _ = mimetypes.guess_type(file_path)
-                            st.download_button(
-                                label="💾 Download Now",
-                                data=file_data,
-                                file_name=os.path.basename(file_path),
-                                mime=mime_type or "application/octet-stream",
-                                key=f"download_{idx}",
-                                use_container_width=True
-                            )
-                        else:
-                            # Show prepare button
-                            if st.button("☁️ Prepare Download", key=f"prepare_{idx}", use_container_width=True):
-                                # Show immediate feedback in the status column
-                                progress_placeholders[idx].info("⏳ Preparing...")
-                                st.toast(f"📁 Reading video {idx+1}...", icon="⏳")
-                                
-                                try:
-                                    with open(file_path, "rb") as f:
-                                        video_data = f.read()
-                                    st.session_state["ready_to_download_files"][idx] = video_data
-                                    st.toast(f"✅ Video {idx+1} ready to download!", icon="✅")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error("❌ Failed to prepare file")
-                                    st.toast(f"❌ Error: {str(e)}", icon="❌")
-                elif status == "failed":
-                    if st.button("Retry", key=f"retry_{idx}", use_container_width=True):
-                        st.session_state["download_queue"][idx]["status"] = "waiting"
-                        st.session_state["is_processing"] = True
-                        st.rerun()
-
-    # Process next video in the queue if one is not already downloading
-    if st.session_state["is_processing"]:
-        next_video_to_process = None
-        for idx, video in enumerate(st.session_state["download_queue"]):
-            if video["status"] == "waiting":
-                next_video_to_process = idx
-                break
-        
-        if next_video_to_process is not None:
-            st.session_state["download_queue"][next_video_to_process]["status"] = "downloading"
-            video_url_to_download = st.session_state["download_queue"][next_video_to_process]["url"]
-            
-            # Use the placeholder to show immediate processing
-            placeholder = progress_placeholders[next_video_to_process]
-            
-            # A hack to pass progress updates back to the session state AND the placeholder
-            class ProgressWrapper:
-                def __init__(self, idx, ph):
-                    self.idx = idx
-                    self.ph = ph
-                def __call__(self, p):
-                    st.session_state["download_queue"][self.idx]["progress"] = p
-                    # Update placeholder immediately for live feedback
-                    self.ph.progress(p)
-                    
-            file_path = download_video(video_url_to_download, ProgressWrapper(next_video_to_process, placeholder))
-            
-            if file_path:
-                st.session_state["download_queue"][next_video_to_process]["status"] = "success"
-                st.session_state["download_queue"][next_video_to_process]["file_path"] = file_path
-            else:
-                st.session_state["download_queue"][next_video_to_process]["status"] = "failed"
-            
-            st.rerun()
-        else:
-            st.session_state["is_processing"] = False
-            st.toast("✅ All videos processed!", icon="✅")
-            st.rerun()
+# Only one page of rows is drawn per run, and while downloads are running the
+# queue is a fragment that refreshes itself without rerunning the whole page.
+QUEUE_PAGE_SIZE = 20
 
-    if any(v['status'] == "success" for v in st.session_state["download_queue"]):
-        st.info(f"Downloads are saved to: {DOWNLOAD_DIR}")
-        
-        # --- Save All Videos Button ---
-        success_videos = [v for v in st.session_state["download_queue"] if v['status'] == "success" and v['file_path'] and os.path.exists(v['file_path'])]
-        
-        if success_videos:
-            st.write("")
-            
-            # Check if ZIP is already prepared
-            if st.session_state["prepared_zip_data"] is not None:
-                # Show the actual download button
-                st.download_button(
-                    label="📥 Download All Videos (ZIP)",
-                    data=st.session_state["prepared_zip_data"],
-                    file_name=f"facebook_reels_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                    mime="application/zip",
-                    key="download_all_zip_final",
-                    use_container_width=True,
-                    type="primary",
-                    help="Download all finished videos in one ZIP file"
+def render_queue_row(idx, video):
+    status = video.status
+
+    # Use a boxed container for each row
+    with st.container(border=True):
+        # Adjusted for better mobile visibility: Index(0.4), URL(3.0), Progress/Status(2.0), Save(1.2)
+        q_cols = st.columns([0.4, 3.0, 2.0, 1.2], vertical_alignment="center")
+
+        with q_cols[0]:
+            st.markdown(f"**{idx+1}.**")
+
+        with q_cols[1]:
+            # Aggressive truncation
+            display_url = video.url
+            if len(display_url) > 18:
+                display_url = f"{display_url[:15]}..."
+            st.markdown(f"`{display_url}`", help=video.url)
+
+        with q_cols[2]:
+            # Status/progress for this row
+            if status == "queued" and video.attempts:
+                st.caption(f"Retrying ({video.attempts + 1}/{RETRY_ATTEMPTS})...", help=video.error)
+            elif status in ("waiting", "queued"):
+                st.caption("Waiting...")
+            elif status == "downloading":
+                stats = [format_rate(video.speed)]
+                if video.eta is not None:
+                    stats.append(f"ETA {format_eta(video.eta)}")
+                st.progress(video.progress, text=" · ".join(filter(None, stats)) or None)
+            elif status == "success":
+                st.markdown(":green[**Ready**]", help="Click to download.")
+            elif status == "failed" and not video.retryable:
+                st.markdown(":red[**Unavailable**]", help=video.error or "This video cannot be downloaded.")
+            elif status == "failed":
+                st.markdown(":red[**Error**]", help=video.error or "Check the URL and try again.")
+
+        with q_cols[3]:
+            if status == "success" and video.file_path:
+                file_download_button(
+                    "💾 Download",
+                    video.file_path,
+                    file_name=os.path.basename(video.file_path),
+                    mime=video.mime_type,
+                    key=f"download_{idx}",
+                    use_container_width=True
                 )
-            else:
-                # Show prepare button
-                if st.button("📦 Prepare ZIP Download", use_container_width=True, type="primary"):
-                    st.toast(f"🗜️ Compressing {len(success_videos)} videos...", icon="⏳")
-                    
-                    # --- Generate ZIP in memory ---
-                    zip_buffer = io.BytesIO()
-                    with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
-                        for v in success_videos:
-                            file_path = v['file_path']
-                            arcname = os.path.basename(file_path)
-                            zip_file.write(file_path, arcname)
-                    
-                    zip_buffer.seek(0)
-                    st.session_state["prepared_zip_data"] = zip_buffer.getvalue()
-                    st.toast("✅ ZIP file ready to download!", icon="✅")
+            elif status == "failed" and video.retryable:
+                if st.button("Retry", key=f"retry_{idx}", use_container_width=True):
+                    video.status = "waiting"
+                    st.session_state["is_processing"] = True
                     st.rerun()
 
+        if status == "failed" and video.log:
+            # What yt_dlp reported for the last attempt
+            with st.expander("Details"):
+                st.code("\n".join(video.log), language=None)
+
+@st.fragment(run_every=1.0 if st.session_state["is_processing"] else None)
+def queue_view():
+    queue = st.session_state["download_queue"]
+
+    # Hand every waiting item to the background engine; the UI only polls their state
+    engine = get_download_engine()
+    if st.session_state["is_processing"]:
+        engine.submit_waiting(
+            queue,
+            functools.partial(download_and_bundle, bundles=get_bundles(), bundle=get_bundle(), **queue.settings()),
+            session=st.session_state["queue_token"]
+        )
+
+    done = queue.count("success")
+    failed = queue.count("failed")
+    st.subheader(f"Queue ({len(queue)})")
+    st.caption(f"✅ {done} ready · ❌ {failed} failed · ⏳ {len(queue) - done - failed} pending")
+    if st.session_state["is_processing"]:
+        load = engine.metrics()
+        st.caption(
+            f"Server: {load['running']}/{load['max_workers']} downloading · {load['queued']} queued "
+            f"across {load['sessions']} session(s) · avg wait {load['wait_avg_s']:.1f}s"
+        )
+        if load['paused_hosts']:
+            st.caption(f"⏸️ Backing off from {', '.join(load['paused_hosts'])} (rate limited)")
+        if done:
+            st.caption(f"📦 {len(get_bundle())} finished video(s) already in the ZIP")
+
+    page_count = (len(queue) + QUEUE_PAGE_SIZE - 1) // QUEUE_PAGE_SIZE
+    page = 1
+    if page_count > 1:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, key="queue_page")
+    for idx, video in queue.page(page - 1, QUEUE_PAGE_SIZE):
+        render_queue_row(idx, video)
+
+    persist_queue()
+
+    # Once nothing is queued or downloading, rerun the full page to show the results
+    if st.session_state["is_processing"] and not queue.has_active():
+        st.session_state["is_processing"] = False
+        st.toast("✅ All videos processed!", icon="✅")
+        st.rerun()
+
+@st.fragment(run_every=1.0)
+def wait_for_zip(bundle):
+    """Polls until the ZIP's queued appends are written, then redraws the page to offer it."""
+    if get_bundles().pending(bundle):
+        st.caption("📦 Adding the last videos to the ZIP...")
+    else:
+        st.rerun()
+
+def zip_view(bundle):
+    if get_bundles().pending(bundle):
+        # Never offer an archive that is still being written to
+        wait_for_zip(bundle)
+        return
+    if bundle:
+        bundle.mark_offered()
+        file_download_button(
+            "📥 Download All Videos (ZIP)",
+            bundle.path,
+            file_name=f"facebook_reels_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+            mime="application/zip",
+            key="download_all_zip_final",
+            use_container_width=True,
+            type="primary",
+            help="Download all finished videos in one ZIP file"
+        )
+
+if st.session_state["download_queue"]:
+    queue_view()
+
+    success_videos = st.session_state["download_queue"].with_status("success")
+    if success_videos:
+        usage = get_downloader().storage.usage()
+        budget = f" of {format_size(usage['max_bytes'])}" if usage['max_bytes'] else ""
+        st.info(f"Downloads are saved to: {DOWNLOAD_DIR} ({format_size(usage['bytes'])}{budget} used)")
+
+        # --- Save All Videos Button ---
+        st.write("")
+
+        if not st.session_state["is_processing"]:
+            queue = st.session_state["download_queue"]
+            bundle = get_bundle()
+            # Workers append each video to the archive as it finishes; once per finished
+            # batch, catch up on anything they missed (a failed append, an evicted file)
+            if st.session_state.get("bundle_synced") != (id(queue), queue.revision):
+                st.session_state["bundle_synced"] = (id(queue), queue.revision)
+                get_bundles().sync_later(bundle, [v.file_path for v in success_videos])
+            zip_view(bundle)
+
 # -----------------------------
 # --- Utility Actions (Reset/Clear) at Bottom ---
 st.divider()
@@ -406,3 +485,5 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+startup.mark("first_paint")
@@ -0,0 +1,202 @@
+"""End-to-end benchmark for the download pipeline against a local fake CDN.
+
+    python benchmarks/bench_pipeline.py [--batch-sizes 8 32] [--concurrency 1 4 8]
+                                        [--size-kb 2048] [--latency-ms 50] [--bandwidth-mbps 0]
+
+A local HTTP server stands in for Facebook's CDN and serves synthetic MP4
+payloads (with Range support, optional per-request latency and per-connection
+bandwidth cap). yt_dlp's generic extractor treats them as direct video links,
+so no network access is needed. For every batch size and concurrency level
+the benchmark runs the queue through DownloadEngine + Downloader (cold cache),
+repeats it against the warm result cache, and appends the files one by one to
+an IncrementalZip, as the app does when each download finishes. Each run
+prints one JSON object: items/s, MB/s, p50/p95 item latency and peak RSS.
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fbdl.cache import ResultCache  # noqa: E402
+from fbdl.download_queue import DownloadQueue  # noqa: E402
+from fbdl.downloader import Downloader  # noqa: E402
+from fbdl.engine import DownloadEngine  # noqa: E402
+from fbdl.zipstream import IncrementalZip  # noqa: E402
+
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)$")
+CHUNK = 64 * 1024
+
+
+class FakeCDN:
+    """Serves /<name>.mp4 payloads of a fixed size from memory."""
+
+    def __init__(self, size_bytes: int, latency_s: float = 0.0, bandwidth_bps: float = 0.0):
+        payload = os.urandom(size_bytes)
+        cdn = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_HEAD(self):
+                self._serve(False)
+
+            def do_GET(self):
+                self._serve(True)
+
+            def _serve(self, send_body):
+                if cdn.latency_s:
+                    time.sleep(cdn.latency_s)
+                start, end, status = 0, len(payload) - 1, 200
+                match = _RANGE_RE.match(self.headers.get("Range", ""))
+                if match:
+                    start = int(match.group(1))
+                    end = int(match.group(2)) if match.group(2) else end
+                    status = 206
+                self.send_response(status)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.send_header("Accept-Ranges", "bytes")
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+                self.end_headers()
+                if not send_body:
+                    return
+                view = memoryview(payload)[start:end + 1]
+                try:
+                    for offset in range(0, len(view), CHUNK):
+                        self.wfile.write(view[offset:offset + CHUNK])
+                        if cdn.bandwidth_bps:
+                            time.sleep(CHUNK / cdn.bandwidth_bps)
+                except (BrokenPipeError, ConnectionResetError):
+                    # yt_dlp hangs up after probing the first bytes
+                    pass
+
+        self.latency_s = latency_s
+        self.bandwidth_bps = bandwidth_bps
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def urls(self, count: int, prefix: str):
+        return [f"{self.base_url}/{prefix}{i:05d}.mp4" for i in range(count)]
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_queue(downloader, urls, concurrency):
+    """Pushes urls through a fresh DownloadEngine; returns (seconds, latencies, queue)."""
+    engine = DownloadEngine(max_workers=concurrency)
+    latencies = []
+    lock = threading.Lock()
+
+    def download_fn(url, progress_callback):
+        start = time.perf_counter()
+        try:
+            return downloader.download(url, progress_callback)
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    queue = DownloadQueue.from_urls(urls)
+    start = time.perf_counter()
+    futures = [engine.submit(item, download_fn) for item in queue]
+    wait(futures)
+    elapsed = time.perf_counter() - start
+    engine.shutdown()
+    return elapsed, latencies, queue
+
+
+def append_all(bundle, paths):
+    """Appends each path to the archive; returns total seconds and per-append latencies."""
+    latencies = []
+    start = time.perf_counter()
+    for path in paths:
+        t0 = time.perf_counter()
+        bundle.append(path)
+        latencies.append(time.perf_counter() - t0)
+    return time.perf_counter() - start, latencies
+
+
+def report(stage, batch, concurrency, seconds, total_bytes, latencies=(), ok=None):
+    print(json.dumps({
+        "stage": stage,
+        "batch": batch,
+        "concurrency": concurrency,
+        "ok": batch if ok is None else ok,
+        "seconds": round(seconds, 4),
+        "items_per_s": round(batch / seconds, 2) if seconds else None,
+        "mb_per_s": round(total_bytes / (1024 * 1024) / seconds, 2) if seconds else None,
+        "p50_s": round(percentile(latencies, 0.50), 4),
+        "p95_s": round(percentile(latencies, 0.95), 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--size-kb", type=int, default=2048, help="payload size per video")
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake CDN time to first byte")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0, help="per-connection cap (0 = unlimited)")
+    args = parser.parse_args()
+
+    size = args.size_kb * 1024
+    cdn = FakeCDN(size, args.latency_ms / 1000, args.bandwidth_mbps * 1024 * 1024 / 8)
+    try:
+        for batch in args.batch_sizes:
+            for concurrency in args.concurrency:
+                workdir = tempfile.mkdtemp(prefix="fbdl-bench-")
+                try:
+                    downloader = Downloader(
+                        os.path.join(workdir, "videos"),
+                        ResultCache(os.path.join(workdir, "cache.sqlite")),
+                    )
+                    urls = cdn.urls(batch, prefix=f"b{batch}c{concurrency}_")
+
+                    seconds, latencies, queue = run_queue(downloader, urls, concurrency)
+                    ok = queue.count("success")
+                    report("download", batch, concurrency, seconds, ok * size, latencies, ok)
+
+                    seconds, latencies, queue = run_queue(downloader, urls, concurrency)
+                    report("download_cached", batch, concurrency, seconds, 0, latencies, queue.count("success"))
+
+                    paths = [item.file_path for item in queue.with_status("success")]
+                    seconds, latencies = append_all(IncrementalZip(os.path.join(workdir, "bundle.zip")), paths)
+                    report("zip", len(paths), 1, seconds, len(paths) * size, latencies)
+                    downloader.ydl_pool.close()
+                finally:
+                    shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        cdn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Cold-start benchmark: time to first paint and to a download-ready YoutubeDL.
+
+    python benchmarks/bench_startup.py [--paint-ms 300] [--runs 3]
+
+Each run is a fresh interpreter. It imports what Home.py imports (minus
+Streamlit), simulates --paint-ms of page rendering, then times what the
+first download would wait for before yt_dlp can start extracting: the
+yt_dlp import, a pooled YoutubeDL and the Facebook extractor. "cold" does
+all of that on demand; "prewarm" starts fbdl.startup.prewarm_in_background
+before painting, as Home.py does. Prints one JSON object per mode.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, tempfile, time
+t0 = time.perf_counter()
+from fbdl import startup
+from fbdl.cache import MetadataCache, ResultCache
+from fbdl.downloader import Downloader
+from fbdl.engine import DownloadEngine
+from fbdl.urls import ingest_urls
+imports_s = time.perf_counter() - t0
+
+workdir = tempfile.mkdtemp(prefix="fbdl-startup-")
+downloader = Downloader(workdir, ResultCache(workdir + "/cache.sqlite"), MetadataCache())
+prewarm = sys.argv[1] == "prewarm"
+if prewarm:
+    thread = startup.prewarm_in_background(downloader)
+time.sleep(float(sys.argv[2]))
+paint_s = time.perf_counter() - t0
+
+if prewarm:
+    thread.join()
+with downloader.ydl_pool.lease(downloader._ydl_opts("best", 0)) as ydl:
+    ydl.get_info_extractor("Facebook")
+ready_s = time.perf_counter() - t0
+print(json.dumps({"imports_s": imports_s, "first_paint_s": paint_s, "download_ready_s": ready_s,
+                  "created": downloader.ydl_pool.created, "reused": downloader.ydl_pool.reused}))
+"""
+
+
+def run(mode, paint_s):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, mode, str(paint_s)],
+        cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT}, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paint-ms", type=float, default=300, help="simulated page render time")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for mode in ("cold", "prewarm"):
+        samples = [run(mode, args.paint_ms / 1000) for _ in range(args.runs)]
+        print(json.dumps({
+            "mode": mode,
+            "runs": args.runs,
+            **{key: round(statistics.median(s[key] for s in samples), 4)
+               for key in ("imports_s", "first_paint_s", "download_ready_s")},
+            "pooled_instance_reused": all(s["reused"] for s in samples) if mode == "prewarm" else False,
+        }), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Micro-benchmark for bulk URL ingestion.
+
+    python benchmarks/bench_urls.py [--sizes 10000 100000] [--repeat 3]
+
+Compares fbdl.urls.ingest_urls against the old per-line loop (clean,
+validate with a freshly compiled pattern, string concatenation) and prints
+one JSON object per input size.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fbdl.urls import clean_facebook_url, ingest_urls  # noqa: E402
+
+_TEMPLATES = [
+    "https://www.facebook.com/reel/{n}",
+    "https://m.facebook.com/reel/{n}/?s=share",
+    "https://web.facebook.com/somepage/videos/{n}/",
+    "https://www.facebook.com/watch/?v={n}",
+    "https://fb.watch/{s}/",
+    "https://www.facebook.com/share/r/{s}/",
+    "https://example.com/not-a-video/{n}",
+    "garbage-{s}",
+]
+
+
+def make_paste(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(size):
+        # ~20% of ids repeat so de-duplication has work to do
+        n = rng.randrange(size * 4 // 5 or 1)
+        s = format(n, "x")
+        lines.append(rng.choice(_TEMPLATES).format(n=n, s=s))
+    return "\n".join(lines)
+
+
+def legacy_ingest(text: str):
+    """The per-line loop Home.py used before ingest_urls."""
+    def is_valid(url):
+        pattern = re.compile(
+            r'^(https?://)?([a-z0-9-]+\.)?(facebook\.com|fb\.watch|fb\.me)/('
+            r'[^ ]*/videos/\d+[^ ]*|reel/\d+[^ ]*|watch/\?v=\d+[^ ]*|'
+            r'story\.php\?story_fbid=\d+[^ ]*|share/r/[A-Za-z0-9_-]+/?|[A-Za-z0-9_-]+/?)',
+            re.IGNORECASE,
+        )
+        return bool(pattern.match(url.strip()))
+
+    urls_input = ""
+    existing = set()
+    for url in re.split(r'[\s\n]+', text.strip()):
+        url = clean_facebook_url(url)
+        if is_valid(url) and url not in existing:
+            urls_input = urls_input + "\n" + url if urls_input else url
+            existing.add(url)
+    return urls_input
+
+
+def best_of(fn, arg, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        paste = make_paste(size)
+        result = ingest_urls(paste)
+        ingest_s = best_of(ingest_urls, paste, args.repeat)
+        legacy_s = best_of(legacy_ingest, paste, args.repeat)
+        print(json.dumps({
+            "benchmark": "ingest_urls",
+            "urls": size,
+            "accepted": len(result.accepted),
+            "rejected": len(result.rejected),
+            "seconds": round(ingest_s, 4),
+            "urls_per_s": round(size / ingest_s),
+            "legacy_seconds": round(legacy_s, 4),
+            "speedup": round(legacy_s / ingest_s, 2),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Download helpers shared by the Streamlit pages.
+
+Exports are resolved on first attribute access, so `import fbdl` (or any one
+submodule) does not drag in the HTTP file server, the engine and the ZIP
+writer before the page needs them.
+"""
+import importlib
+
+_EXPORTS = {
+    "BundleRegistry": "fbdl.zipstream",
+    "DownloadEngine": "fbdl.engine",
+    "DownloadQueue": "fbdl.download_queue",
+    "FileServer": "fbdl.fileserver",
+    "IncrementalZip": "fbdl.zipstream",
+    "QueueItem": "fbdl.download_queue",
+    "SingleFlight": "fbdl.singleflight",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'fbdl' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,7 @@
+import sys
+
+from fbdl.cli import main
+
+# Guarded so spawned worker processes (see fbdl.faststart) can re-import this module
+if __name__ == "__main__":
+    sys.exit(main())
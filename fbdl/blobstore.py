@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# -----------------------------
+# Content-addressed blob store
+# -----------------------------
+# Every finished download is stored once per SHA-256 digest under
+# <root>/<aa>/<digest> and the user-facing file name in the download
+# directory is a hard link to that blob. A second download with the same
+# bytes (a repost under another id, a renamed title, another session) is
+# linked to the existing blob and costs no extra disk. Where hard links are
+# not supported the file simply stays where yt_dlp wrote it.
+#
+# The store keeps a small SQLite index of name -> digest, so names can be
+# re-pointed when a blob is rewritten (fbdl.faststart replaces the blob with
+# a new inode). fbdl.storage removes a blob together with the last name it
+# evicts; a blob whose only remaining link is its own entry for another
+# reason (names deleted by hand, a name evicted while its blob was being
+# rewritten) is garbage and removed by gc().
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS names (
+    path      TEXT PRIMARY KEY,
+    digest    TEXT NOT NULL,
+    linked_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS names_digest ON names (digest);
+"""
+_READ_CHUNK = 1024 * 1024
+
+
+class StreamingHasher:
+    """yt_dlp progress hook that hashes the file as it grows on disk.
+
+    Each 'downloading' update reads only the bytes appended since the last
+    one (still in the page cache), so the digest is ready when the transfer
+    ends instead of costing a second full read. digest(path) finishes the job
+    and falls back to hashing `path` from scratch if what was streamed does
+    not match it (e.g. a post-processor rewrote the file).
+    """
+
+    def __init__(self):
+        self._hash = hashlib.sha256()
+        self._name = None
+        self._offset = 0
+
+    def __call__(self, d):
+        if self._hash is None or d.get('status') not in ('downloading', 'finished') or not d.get('filename'):
+            return
+        if self._name is None:
+            self._name = d['filename']
+        elif d['filename'] != self._name:
+            # A second stream (e.g. separate audio for a merge); hash the final file instead
+            self._hash = None
+            return
+        try:
+            self._consume(d.get('tmpfilename') if d['status'] == 'downloading' else d['filename'])
+        except OSError:
+            self._hash = None
+
+    def _consume(self, path):
+        # The .part file is renamed, not copied, when it completes, so one offset covers both names
+        with open(path or self._name, "rb") as f:
+            if os.fstat(f.fileno()).st_size < self._offset:
+                self._hash = None
+                return
+            f.seek(self._offset)
+            for chunk in iter(lambda: f.read(_READ_CHUNK), b""):
+                self._hash.update(chunk)
+                self._offset += len(chunk)
+
+    def digest(self, path: str) -> str:
+        if self._hash is not None and self._name is not None and os.path.abspath(path) == os.path.abspath(self._name):
+            try:
+                self._consume(path)
+                if self._hash is not None and self._offset == os.path.getsize(path):
+                    return self._hash.hexdigest()
+            except OSError:
+                pass
+        return hash_file(path)
+
+
+def hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BlobStore:
+    """One blob per content digest; user-facing names are hard links into it."""
+
+    def __init__(self, root, gc_interval: float = 600):
+        self.root = str(root)
+        self.gc_interval = gc_interval
+        self._lock = threading.Lock()
+        self._gc_at = 0.0
+        os.makedirs(self.root, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(os.path.join(self.root, "index.sqlite"), timeout=30)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def adopt(self, path: str, digest: str) -> str:
+        """Stores `path` under its digest and returns the blob path (or `path` if linking is unsupported)."""
+        blob = self.blob_path(digest)
+        path = os.path.abspath(path)
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                if os.path.exists(blob):
+                    if not os.path.samefile(blob, path):
+                        # Same bytes already stored: swap the new copy for a link to the blob
+                        self._link_over(blob, path)
+                else:
+                    os.link(path, blob)
+            except OSError as e:
+                logging.error(f"Could not de-duplicate {path}: {e}")
+                return path
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO names (path, digest, linked_at) VALUES (?, ?, ?)",
+                    (path, digest, time.time()),
+                )
+        self.maybe_gc()
+        return blob
+
+    @staticmethod
+    def _link_over(blob, path):
+        tmp = f"{path}.link"
+        os.link(blob, tmp)
+        os.replace(tmp, path)
+
+    def names(self, digest: str) -> list:
+        with self._lock, self._connect() as conn:
+            rows = conn.execute("SELECT path FROM names WHERE digest = ?", (digest,)).fetchall()
+        return [path for path, in rows]
+
+    def relink(self, digest: str) -> int:
+        """Points every name of `digest` at the current blob (after the blob was replaced)."""
+        blob = self.blob_path(digest)
+        if not os.path.exists(blob):
+            return 0
+        relinked = 0
+        with self._lock, self._connect() as conn:
+            for path, in conn.execute("SELECT path FROM names WHERE digest = ?", (digest,)).fetchall():
+                if not os.path.exists(path):
+                    conn.execute("DELETE FROM names WHERE path = ?", (path,))
+                    continue
+                if os.path.samefile(blob, path):
+                    continue
+                try:
+                    self._link_over(blob, path)
+                    relinked += 1
+                except OSError as e:
+                    logging.error(f"Could not relink {path}: {e}")
+        return relinked
+
+    def maybe_gc(self):
+        if time.monotonic() - self._gc_at > self.gc_interval:
+            self.gc()
+
+    def gc(self) -> int:
+        """Removes blobs no user-facing name links to any more and forgets names of removed blobs."""
+        self._gc_at = time.monotonic()
+        removed = 0
+        with self._lock, self._connect() as conn:
+            for shard in os.scandir(self.root):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.stat().st_nlink > 1:
+                        continue
+                    # A rewritten blob is unlinked from its names until relink() catches up
+                    names = conn.execute("SELECT path FROM names WHERE digest = ?", (entry.name,)).fetchall()
+                    if any(os.path.exists(path) for path, in names):
+                        continue
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        continue
+                    conn.execute("DELETE FROM names WHERE digest = ?", (entry.name,))
+                    removed += 1
+            # Blobs fbdl.storage removed along with their last name
+            digests = [digest for digest, in conn.execute("SELECT DISTINCT digest FROM names").fetchall()]
+            conn.executemany(
+                "DELETE FROM names WHERE digest = ?",
+                [(digest,) for digest in digests if not os.path.exists(self.blob_path(digest))],
+            )
+        return removed
+
+    def stats(self) -> dict:
+        blobs = 0
+        size = 0
+        for shard in os.scandir(self.root):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    blobs += 1
+                    size += entry.stat().st_size
+        with self._lock, self._connect() as conn:
+            names = conn.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+        return {"blobs": blobs, "bytes": size, "names": names}
@@ -0,0 +1,188 @@
+import copy
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from fbdl.urls import cache_key
+
+# -----------------------------
+# Persistent URL -> file result cache
+# -----------------------------
+# One SQLite index shared by every session (and every process pointing at the
+# same file). `results` holds one row per downloaded (video id, format);
+# `urls` maps each URL key we have seen (see fbdl.urls.cache_key, e.g.
+# "video:123" for every spelling of that reel) to the video id it resolved
+# to, so a repeat request can be answered without any network traffic.
+#
+# The cache never deletes files: fbdl.storage.StorageManager is the only
+# component that evicts from the download directory. Rows whose file is gone
+# are dropped when looked up, and in a periodic sweep on put().
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    video_id    TEXT NOT NULL,
+    format      TEXT NOT NULL,
+    file_path   TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (video_id, format)
+);
+CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access);
+CREATE TABLE IF NOT EXISTS urls (
+    url       TEXT PRIMARY KEY,
+    video_id  TEXT NOT NULL,
+    seen_at   REAL NOT NULL
+);
+"""
+
+
+class ResultCache:
+    """SQLite index of finished downloads with TTL expiry; files themselves belong to fbdl.storage."""
+
+    def __init__(self, db_path: str, ttl: float = 7 * 24 * 3600, prune_interval: float = 600):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def lookup(self, url: str, fmt: str = "best"):
+        """Returns the cached file path for a URL, or None."""
+        key = cache_key(url)
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT video_id FROM urls WHERE url = ?", (key,)).fetchone()
+            if row is not None:
+                return self._get(conn, row[0], fmt)
+            if key.startswith("video:"):
+                # Reel/video/watch URLs carry the same id yt_dlp reports
+                return self._get(conn, key[len("video:"):], fmt)
+            return None
+
+    def lookup_id(self, video_id: str, fmt: str = "best"):
+        """Returns the cached file path for an extracted video id, or None."""
+        with self._lock, self._connect() as conn:
+            return self._get(conn, video_id, fmt)
+
+    def _get(self, conn, video_id, fmt):
+        row = conn.execute(
+            "SELECT file_path, created_at FROM results WHERE video_id = ? AND format = ?",
+            (video_id, fmt),
+        ).fetchone()
+        if row is None:
+            return None
+        file_path, created_at = row
+        now = time.time()
+        if now - created_at > self.ttl or not os.path.exists(file_path):
+            conn.execute("DELETE FROM results WHERE video_id = ? AND format = ?", (video_id, fmt))
+            return None
+        conn.execute(
+            "UPDATE results SET last_access = ? WHERE video_id = ? AND format = ?",
+            (now, video_id, fmt),
+        )
+        return file_path
+
+    def put(self, url: str, video_id: str, file_path: str, fmt: str = "best"):
+        """Records a finished download; expired and orphaned rows are swept now and then."""
+        now = time.time()
+        size = os.path.getsize(file_path)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO urls (url, video_id, seen_at) VALUES (?, ?, ?)",
+                (cache_key(url), video_id, now),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO results (video_id, format, file_path, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (video_id, fmt, file_path, size, now, now),
+            )
+            if time.monotonic() - self._pruned_at > self.prune_interval:
+                self._prune(conn, now)
+
+    def _prune(self, conn, now):
+        """Drops expired rows and rows whose file was evicted; never touches the files."""
+        self._pruned_at = time.monotonic()
+        conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl,))
+        gone = [
+            (video_id, fmt)
+            for video_id, fmt, file_path in conn.execute("SELECT video_id, format, file_path FROM results").fetchall()
+            if not os.path.exists(file_path)
+        ]
+        conn.executemany("DELETE FROM results WHERE video_id = ? AND format = ?", gone)
+        conn.execute("DELETE FROM urls WHERE seen_at < ?", (now - self.ttl,))
+
+    def stats(self) -> dict:
+        with self._lock, self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {"entries": count, "bytes": total}
+
+    def remember_url(self, url: str, video_id: str):
+        """Maps another URL (e.g. a short link) onto an already cached video id."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO urls (url, video_id, seen_at) VALUES (?, ?, ?)",
+                (cache_key(url), video_id, time.time()),
+            )
+
+
+# -----------------------------
+# Short-lived metadata cache
+# -----------------------------
+# Extractor output (yt_dlp info dicts) is only valid for a few minutes because
+# Facebook's signed media URLs expire, so this cache lives in memory with a
+# short TTL. Entries are keyed by fbdl.urls.cache_key, and short links
+# (fb.watch, fb.me, share/r/) are stored as aliases of the canonical video.
+class MetadataCache:
+    """Thread-safe in-memory TTL cache of yt_dlp info dicts keyed by URL."""
+
+    def __init__(self, ttl: float = 600, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, url: str):
+        """Returns a private copy of the cached info dict, or None."""
+        key = cache_key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, info = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(info)
+
+    def put(self, url: str, info: dict):
+        """Stores info under the requested URL and every canonical URL it resolved to."""
+        keys = {cache_key(url)}
+        for field in ("webpage_url", "original_url"):
+            if info.get(field):
+                keys.add(cache_key(info[field]))
+        if info.get("id") and str(info["id"]).isdigit():
+            keys.add(f"video:{info['id']}")
+        entry = (time.time(), copy.deepcopy(info))
+        with self._lock:
+            for key in keys:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, url: str):
+        with self._lock:
+            self._entries.pop(cache_key(url), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
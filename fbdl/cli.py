@@ -0,0 +1,177 @@
+"""Headless batch downloader.
+
+    python -m fbdl batch urls.txt --jobs 8 --out DIR
+
+Progress is written to stdout as JSON lines, one event per line:
+``accepted``/``rejected`` while reading the input, ``progress`` while
+downloading and ``done`` when an item finishes (failed items carry the error
+and the tail of yt_dlp's log). Streamlit is never imported.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import wait
+
+from fbdl import config
+from fbdl.blobstore import BlobStore
+from fbdl.cache import MetadataCache, ResultCache
+from fbdl.download_queue import DownloadQueue, QueueItem
+from fbdl.downloader import Downloader
+from fbdl.engine import DownloadEngine
+from fbdl.faststart import FaststartPool
+from fbdl.formats import DEFAULT_PRESET, PRESETS
+from fbdl.metrics import REGISTRY
+from fbdl.queue_store import QueueStore
+from fbdl.retry import CircuitBreaker, RetryPolicy
+from fbdl.storage import StorageManager
+from fbdl.urls import ingest_urls
+
+_print_lock = threading.Lock()
+
+
+def emit(event: str, **fields):
+    line = json.dumps({"event": event, "time": round(time.time(), 3), **fields})
+    with _print_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def read_urls(lines):
+    """Cleans, validates and de-duplicates input lines, emitting accepted/rejected events."""
+    result = ingest_urls(line for line in lines if not line.lstrip().startswith("#"))
+    for raw, reason in result.rejected:
+        emit("rejected", url=raw, reason=reason)
+    for url in result.accepted:
+        emit("accepted", url=url)
+    return result.accepted
+
+
+def resume_token(value: str) -> str:
+    """argparse type for --resume: a name QueueStore can save under."""
+    if not QueueStore.is_valid_token(value):
+        raise argparse.ArgumentTypeError(f"{value!r} is not a valid token (8-64 letters, digits, '-' or '_')")
+    return value
+
+
+def run_batch(urls, downloader: Downloader, jobs: int, store: QueueStore = None, token: str = None,
+              quality: str = DEFAULT_PRESET, max_filesize_mb: int = 0) -> int:
+    """Downloads every URL with `jobs` workers and returns the number of failures.
+
+    With a store and token, progress is saved after every finished item and a
+    rerun with the same token skips items that already succeeded or failed
+    permanently.
+    """
+    engine = DownloadEngine(
+        max_workers=jobs,
+        host_rate=config.HOST_RATE,
+        retry=RetryPolicy(config.RETRY_ATTEMPTS, config.RETRY_BASE_DELAY, config.RETRY_MAX_DELAY),
+        breaker=CircuitBreaker(config.BREAKER_THRESHOLD, config.BREAKER_COOLDOWN),
+    )
+    save_lock = threading.Lock()
+
+    def download_fn(url, progress_callback):
+        def report(p, speed=None, eta=None):
+            progress_callback(p, speed=speed, eta=eta)
+            emit("progress", url=url, progress=round(p, 4),
+                 bytes_per_s=round(speed) if speed else None,
+                 eta_s=round(eta, 1) if eta is not None else None)
+
+        return downloader.download(url, report, quality=quality, max_filesize_mb=max_filesize_mb)
+
+    saved = {item.url: item for item in (store.load(token) or [])} if store else {}
+    def restore(url):
+        item = saved.get(url)
+        if item is not None and (item.status == "success" or (item.status == "failed" and not item.retryable)):
+            return QueueItem(url, item.status, item.file_path, item.progress, item.error, item.retryable, item.log)
+        return QueueItem(url)
+
+    items = DownloadQueue(
+        (restore(u) for u in urls),
+        quality=quality,
+        max_filesize_mb=max_filesize_mb,
+    )
+
+    def on_done(future):
+        emit("done", **_summary(futures[future]))
+        if store:
+            with save_lock:
+                store.save(token, items)
+
+    futures = {}
+    for item in items:
+        if item.status in ("success", "failed"):
+            emit("done", **_summary(item))
+        else:
+            futures[engine.submit(item, download_fn)] = item
+    try:
+        for future in list(futures):
+            future.add_done_callback(on_done)
+        wait(futures)
+    finally:
+        engine.shutdown()
+    return len(items) - items.count("success")
+
+
+def _summary(item):
+    summary = {"url": item.url, "status": item.status, "file_path": item.file_path}
+    if item.status == "failed":
+        summary["error"] = item.error
+        summary["retryable"] = item.retryable
+        # What yt_dlp logged for the last attempt (warnings and errors, sampled debug lines)
+        summary["log"] = list(item.log)
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="fbdl", description="Facebook video & reels downloader")
+    commands = parser.add_subparsers(dest="command", required=True)
+    batch = commands.add_parser("batch", help="download every URL listed in a file ('-' for stdin)")
+    batch.add_argument("urls_file")
+    batch.add_argument("--jobs", "-j", type=int, default=config.MAX_WORKERS, help="concurrent downloads")
+    batch.add_argument("--out", "-o", default=str(config.DOWNLOAD_DIR), help="output directory")
+    batch.add_argument("--cache-db", default=config.CACHE_DB, help="result cache database")
+    batch.add_argument("--quality", "-q", choices=list(PRESETS), default=DEFAULT_PRESET, help="quality preset")
+    batch.add_argument("--max-filesize", type=int, default=0, metavar="MB", help="skip formats larger than this")
+    batch.add_argument("--max-bytes", type=int, default=0,
+                       help="evict least recently used files in --out to stay under this size and keep the "
+                            "disk from filling up (0 = never evict)")
+    batch.add_argument("--resume", metavar="TOKEN", type=resume_token,
+                       help="persist progress under this name and skip items a previous run finished")
+    batch.add_argument("--metrics-out", metavar="FILE",
+                       help="write stage timings and counters in Prometheus text format when done")
+    args = parser.parse_args(argv)
+
+    if args.urls_file == "-":
+        urls = read_urls(sys.stdin)
+    else:
+        with open(args.urls_file, encoding="utf-8") as f:
+            urls = read_urls(f)
+
+    downloader = Downloader(
+        args.out,
+        ResultCache(args.cache_db, ttl=config.CACHE_TTL),
+        MetadataCache(ttl=config.METADATA_TTL),
+        storage=StorageManager(
+            args.out,
+            max_bytes=args.max_bytes,
+            max_age=0,
+            # --out may be any folder of the user's; without a budget nothing in it is ever evicted
+            min_free_bytes=config.STORAGE_MIN_FREE_BYTES if args.max_bytes else 0,
+            link_dirs=[os.path.join(args.out, ".blobs")] if config.DEDUPE else (),
+        ),
+        faststart=FaststartPool(config.FASTSTART_WORKERS) if config.FASTSTART_WORKERS else None,
+        blobs=BlobStore(os.path.join(args.out, ".blobs")) if config.DEDUPE else None,
+    )
+    store = QueueStore(config.STATE_DIR) if args.resume else None
+    failures = run_batch(urls, downloader, args.jobs, store, args.resume, args.quality, args.max_filesize)
+    if downloader.faststart:
+        # Let queued MP4 rewrites finish before the process exits
+        downloader.faststart.shutdown(wait=True)
+    emit("summary", total=len(urls), failed=failures)
+    if args.metrics_out:
+        with open(args.metrics_out, "w", encoding="utf-8") as f:
+            f.write(REGISTRY.render())
+    return 1 if failures else 0
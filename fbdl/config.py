@@ -0,0 +1,66 @@
+import os
+from pathlib import Path
+
+# -----------------------------
+# Runtime settings (overridable through environment variables)
+# -----------------------------
+# Folder finished videos are saved to. It is managed by fbdl.storage (old
+# files get evicted), so by default it is a dedicated sub-folder.
+DOWNLOAD_DIR = Path(os.environ.get("FBDL_DOWNLOAD_DIR", str(Path.home() / "Downloads" / "Facebook Reels")))
+# Byte budget for DOWNLOAD_DIR (0 = unlimited) and how long files are kept
+STORAGE_MAX_BYTES = int(os.environ.get("FBDL_STORAGE_MAX_BYTES", str(20 * 1024 ** 3)))
+STORAGE_MAX_AGE = float(os.environ.get("FBDL_STORAGE_MAX_AGE", str(7 * 24 * 3600)))
+# Disk space that must stay free on the download volume
+STORAGE_MIN_FREE_BYTES = int(os.environ.get("FBDL_STORAGE_MIN_FREE_BYTES", str(1024 ** 3)))
+# Number of yt_dlp jobs allowed in flight at the same time
+MAX_WORKERS = int(os.environ.get("FBDL_MAX_WORKERS", "4"))
+
+# Built-in range-capable file route that streams downloads from disk. It is
+# only started when FILE_SERVER_URL (the address browsers use to reach it,
+# e.g. https://example.com/fbdl behind a reverse proxy) is set; otherwise the
+# app falls back to Streamlit's download_button, which loads each file fully
+# into server memory when it is clicked.
+FILE_SERVER_URL = os.environ.get("FBDL_FILE_SERVER_URL", "")
+FILE_SERVER_PORT = int(os.environ.get("FBDL_FILE_SERVER_PORT", "8502"))
+# Interface the route listens on; the proxy in front of it connects locally
+FILE_SERVER_HOST = os.environ.get("FBDL_FILE_SERVER_HOST", "127.0.0.1")
+
+# Persistent result cache (SQLite index of finished downloads; the files are
+# budgeted and evicted by the storage settings above)
+CACHE_DB = os.environ.get("FBDL_CACHE_DB", os.path.join(os.path.expanduser("~"), ".cache", "fbdl", "results.sqlite"))
+CACHE_TTL = float(os.environ.get("FBDL_CACHE_TTL", str(7 * 24 * 3600)))
+# Extracted metadata is kept in memory only briefly (signed media URLs expire)
+METADATA_TTL = float(os.environ.get("FBDL_METADATA_TTL", "600"))
+
+# Where queue state files are kept so batches survive refreshes and restarts
+STATE_DIR = os.environ.get("FBDL_STATE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "fbdl", "queues"))
+
+# Minimum spacing of job starts against one host, as starts per second (0 = unlimited)
+HOST_RATE = float(os.environ.get("FBDL_HOST_RATE", "2"))
+
+# Pooled YoutubeDL instances are closed after this many idle seconds or leases
+YDL_IDLE_TIMEOUT = float(os.environ.get("FBDL_YDL_IDLE_TIMEOUT", "300"))
+YDL_MAX_USES = int(os.environ.get("FBDL_YDL_MAX_USES", "100"))
+
+# Automatic retries of retryable failures (jittered exponential backoff, seconds)
+RETRY_ATTEMPTS = int(os.environ.get("FBDL_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.environ.get("FBDL_RETRY_BASE_DELAY", "2"))
+RETRY_MAX_DELAY = float(os.environ.get("FBDL_RETRY_MAX_DELAY", "60"))
+
+# Pause a host after this many retryable failures in a row (0 = never), for this many seconds
+BREAKER_THRESHOLD = int(os.environ.get("FBDL_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("FBDL_BREAKER_COOLDOWN", "30"))
+
+# Contact-form feedback (SQLite); the old CSV is imported once if present
+FEEDBACK_DB = os.environ.get("FBDL_FEEDBACK_DB", "feedback.sqlite")
+FEEDBACK_CSV = os.environ.get("FBDL_FEEDBACK_CSV", "feedback.csv")
+
+# Worker processes rewriting downloaded MP4s with the index up front (0 = off)
+FASTSTART_WORKERS = int(os.environ.get("FBDL_FASTSTART_WORKERS", "1"))
+
+# Content-addressed store for de-duplicating downloads; must be on the same
+# filesystem as DOWNLOAD_DIR (hard links). Set FBDL_DEDUPE=0 to turn it off.
+DEDUPE = os.environ.get("FBDL_DEDUPE", "1") != "0"
+
+# Per-queue "Download All" ZIPs; inside DOWNLOAD_DIR so they count towards its budget
+BUNDLE_DIR = DOWNLOAD_DIR / ".bundles"
@@ -0,0 +1,148 @@
+import mimetypes
+import threading
+
+from fbdl.formats import DEFAULT_PRESET
+
+# -----------------------------
+# Compact download queue
+# -----------------------------
+# Queue rows are __slots__ records instead of dicts, and the queue keeps a
+# status -> items index up to date as worker threads change an item's status.
+# Counting, "what is still waiting" and "which files are finished" are then
+# answered without scanning (or stat-ing) every row on each Streamlit rerun.
+STATUSES = ("waiting", "queued", "downloading", "success", "failed")
+ACTIVE_STATUSES = ("queued", "downloading")
+
+
+class QueueItem:
+    """One URL in a download queue."""
+
+    __slots__ = ("url", "file_path", "progress", "speed", "eta", "mime_type", "error", "retryable", "log",
+                 "attempts", "_status", "_queue")
+
+    def __init__(self, url: str, status: str = "waiting", file_path: str = None, progress: float = 0.0,
+                 error: str = None, retryable: bool = True, log=()):
+        self.url = url
+        self.file_path = file_path
+        self.progress = progress
+        # Transfer rate (bytes/s) and seconds remaining while downloading
+        self.speed = None
+        self.eta = None
+        self.mime_type = None
+        # Last failure, whether trying again can help, and the captured yt_dlp log lines
+        self.error = error
+        self.retryable = retryable
+        self.log = tuple(log)
+        # Automatic retries made so far by the engine (see fbdl.retry)
+        self.attempts = 0
+        self._status = status
+        self._queue = None
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str):
+        old = self._status
+        if old == value:
+            return
+        if value == "success" and self.file_path and self.mime_type is None:
+            self.mime_type = mimetypes.guess_type(self.file_path)[0] or "application/octet-stream"
+        self._status = value
+        if self._queue is not None:
+            self._queue._move(self, old, value)
+
+    def to_record(self) -> dict:
+        record = {"url": self.url, "status": self._status, "file_path": self.file_path}
+        if self.error:
+            record["error"] = self.error
+            record["retryable"] = self.retryable
+        if self.log:
+            record["log"] = list(self.log)
+        return record
+
+    def __repr__(self):
+        return f"QueueItem({self.url!r}, status={self._status!r})"
+
+
+class DownloadQueue:
+    """Ordered list of QueueItem records with a live status index."""
+
+    def __init__(self, items=(), quality: str = DEFAULT_PRESET, max_filesize_mb: int = 0):
+        # Download settings shared by the whole batch (see fbdl.formats)
+        self.quality = quality
+        self.max_filesize_mb = max_filesize_mb
+        self._lock = threading.Lock()
+        self._items = []
+        self._by_status = {status: {} for status in STATUSES}
+        # Bumped on every append or status change, so callers can tell cheaply
+        # whether anything worth saving or redrawing happened since last time
+        self.revision = 0
+        for item in items:
+            self.append(item)
+
+    @classmethod
+    def from_urls(cls, urls, **settings):
+        return cls((QueueItem(url) for url in urls), **settings)
+
+    @classmethod
+    def from_records(cls, records, **settings):
+        return cls(
+            (QueueItem(r["url"], r.get("status", "waiting"), r.get("file_path"), r.get("progress", 0.0),
+                       r.get("error"), r.get("retryable", True), r.get("log", ()))
+             for r in records),
+            **settings
+        )
+
+    def settings(self) -> dict:
+        return {"quality": self.quality, "max_filesize_mb": self.max_filesize_mb}
+
+    def append(self, item: QueueItem):
+        with self._lock:
+            item._queue = self
+            self._items.append(item)
+            # dicts keep insertion order, so each bucket doubles as an ordered set
+            self._by_status[item.status][item] = None
+            self.revision += 1
+
+    def _move(self, item, old, new):
+        with self._lock:
+            self._by_status[old].pop(item, None)
+            self._by_status[new][item] = None
+            self.revision += 1
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __getitem__(self, idx):
+        return self._items[idx]
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def index(self, item) -> int:
+        return self._items.index(item)
+
+    def count(self, *statuses) -> int:
+        with self._lock:
+            return sum(len(self._by_status[s]) for s in statuses)
+
+    def with_status(self, *statuses) -> list:
+        """Items currently in any of `statuses`, in the order they entered that status."""
+        with self._lock:
+            return [item for s in statuses for item in self._by_status[s]]
+
+    def has_active(self) -> bool:
+        return self.count(*ACTIVE_STATUSES) > 0
+
+    def page(self, page: int, page_size: int):
+        """Returns [(index, item)] for one page (0-based)."""
+        start = page * page_size
+        return list(enumerate(self._items[start:start + page_size], start=start))
+
+    def to_records(self) -> list:
+        return [item.to_record() for item in self._items]
@@ -0,0 +1,195 @@
+import functools
+import logging
+import os
+from pathlib import Path
+
+from fbdl.blobstore import BlobStore, StreamingHasher
+from fbdl.cache import MetadataCache, ResultCache
+from fbdl.failures import DownloadFailed, YDLLogger, capture, classify, retry_after
+from fbdl.faststart import FaststartPool
+from fbdl.formats import DEFAULT_PRESET, filename_suffix, format_key, format_spec
+from fbdl.metrics import BYTES_DOWNLOADED, DOWNLOAD_ERRORS, DOWNLOADS, cache_lookup, error_class, stage
+from fbdl.progress import ThrottledProgress
+from fbdl.startup import mark
+from fbdl.singleflight import SingleFlight
+from fbdl.storage import StorageFull, StorageManager, TooLarge
+from fbdl.ydl_pool import YDLPool
+
+# Options every pooled YoutubeDL shares; per-download options (format,
+# output template, size cap) select which pooled instance is leased
+YDL_BASE_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    # Captured per job (see fbdl.failures) instead of printed
+    'logger': YDLLogger(),
+    # Keep .part files and resume them with HTTP range requests after an interruption
+    'continuedl': True,
+    'nopart': False,
+    'retries': 10,
+}
+
+
+# -----------------------------
+# Download engine shared by the Streamlit app and the CLI
+# -----------------------------
+# yt_dlp is imported on first use (by the YoutubeDL pool) so that importing
+# this module (e.g. for the CLI's --help or URL validation) stays cheap.
+class Downloader:
+    """Resolves, caches and downloads Facebook videos into download_dir."""
+
+    def __init__(self, download_dir, result_cache: ResultCache, metadata_cache: MetadataCache = None,
+                 flights: SingleFlight = None, storage: StorageManager = None, ydl_pool: YDLPool = None,
+                 faststart: FaststartPool = None, blobs: BlobStore = None):
+        self.download_dir = Path(download_dir)
+        self.result_cache = result_cache
+        self.metadata_cache = metadata_cache or MetadataCache()
+        self.flights = flights or SingleFlight()
+        self.storage = storage or StorageManager(self.download_dir, max_bytes=0, max_age=0)
+        self.ydl_pool = ydl_pool or YDLPool()
+        self.ydl_pool.base_opts = {**YDL_BASE_OPTS, **self.ydl_pool.base_opts}
+        # Optional post-download stage moving the MP4 index to the front (runs in other processes)
+        self.faststart = faststart
+        # Optional content-addressed store: identical payloads share one file on disk
+        self.blobs = blobs
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+
+    def _ydl_opts(self, quality, max_filesize_mb):
+        ydl_opts = {
+            'format': format_spec(quality, max_filesize_mb),
+            'outtmpl': str(self.download_dir / f'%(title).50s_%(id)s{filename_suffix(quality, max_filesize_mb)}.%(ext)s'),
+        }
+        if max_filesize_mb:
+            ydl_opts['max_filesize'] = max_filesize_mb * 1024 * 1024
+        return ydl_opts
+
+    def prewarm(self, quality: str = DEFAULT_PRESET, max_filesize_mb: int = 0):
+        """Imports yt_dlp and parks a YoutubeDL with the Facebook extractor initialized in the pool.
+
+        The next download with the same settings leases that instance instead
+        of paying for the import and extractor setup itself.
+        """
+        with self.ydl_pool.lease(self._ydl_opts(quality, max_filesize_mb)) as ydl:
+            ydl.get_info_extractor('Facebook')
+
+    def extract_metadata(self, ydl, video_url):
+        """Returns (info, from_cache); short links are followed to the canonical video."""
+        info = self.metadata_cache.get(video_url)
+        cache_lookup("metadata", info is not None)
+        if info is not None:
+            return info, True
+
+        with stage("metadata"):
+            info = ydl.extract_info(video_url, download=False, process=False)
+            for _ in range(5):
+                if info.get('_type') != 'url':
+                    break
+                info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+        self.metadata_cache.put(video_url, info)
+        return info, False
+
+    def download(self, video_url, progress_callback, quality: str = DEFAULT_PRESET, max_filesize_mb: int = 0):
+        """Downloads a video and returns its local path.
+
+        `progress_callback(fraction, speed=None, eta=None)` receives throttled
+        updates; speed is in bytes/s and eta in seconds when known. `quality`
+        is a fbdl.formats preset and `max_filesize_mb` an optional size cap.
+        Failures raise fbdl.failures.DownloadFailed, classified as retryable
+        or permanent and carrying the job's captured yt_dlp log.
+        """
+        with capture() as log:
+            return self._download(video_url, progress_callback, quality, max_filesize_mb, log)
+
+    def _make_room(self, needed_bytes):
+        try:
+            self.storage.ensure_headroom(needed_bytes)
+        except TooLarge:
+            raise
+        except StorageFull:
+            # Orphaned blobs count towards usage but only gc() knows they are garbage
+            if not (self.blobs and self.blobs.gc()):
+                raise
+            self.storage.ensure_headroom(needed_bytes)
+
+    def _download(self, video_url, progress_callback, quality, max_filesize_mb, log):
+        fmt = format_key(quality, max_filesize_mb)
+        cached_path = self.result_cache.lookup(video_url, fmt)
+        cache_lookup("result", bool(cached_path))
+        if cached_path:
+            self.storage.touch(cached_path)
+            progress_callback(1.0)
+            DOWNLOADS.inc("cached")
+            return cached_path
+
+        # Rebound to the single-flight reporter once this call leads a download
+        emit_progress = progress_callback
+
+        # Coalesces yt_dlp's per-chunk callbacks into a few updates per second
+        progress_hook = ThrottledProgress(lambda p, **stats: emit_progress(p, **stats))
+        if self.blobs:
+            # Hash the payload as it lands on disk, for de-duplication when it finishes
+            hasher = StreamingHasher()
+            throttled = progress_hook
+
+            def progress_hook(d):
+                hasher(d)
+                throttled(d)
+
+        ydl_opts = self._ydl_opts(quality, max_filesize_mb)
+
+        from_cache = False
+        try:
+            with self.ydl_pool.lease(ydl_opts, progress_hook) as ydl:
+                info, from_cache = self.extract_metadata(ydl, video_url)
+
+                # Another URL for the same video may already be on disk
+                cached_path = info.get('id') and self.result_cache.lookup_id(info['id'], fmt)
+                cache_lookup("result_by_id", bool(cached_path))
+                if cached_path:
+                    self.result_cache.remember_url(video_url, info['id'])
+                    self.storage.touch(cached_path)
+                    progress_callback(1.0)
+                    DOWNLOADS.inc("cached")
+                    return cached_path
+
+                # Make room (or refuse) before fetching anything large
+                self._make_room(info.get('filesize') or info.get('filesize_approx') or 0)
+
+                def transfer(report_progress):
+                    nonlocal emit_progress
+                    emit_progress = report_progress
+                    with stage("transfer"):
+                        processed = ydl.process_ie_result(info, download=True)
+                    with stage("finalize"):
+                        path = ydl.prepare_filename(processed)
+                        if not Path(path).suffix:
+                            path = f"{path}.{processed.get('ext', 'mp4')}"
+                        if not os.path.exists(path):
+                            # yt_dlp skips (rather than fails) files over max_filesize
+                            raise RuntimeError(f"No file written for {video_url} (over the {max_filesize_mb} MB cap?)")
+                        rewrite_path, on_rewritten = path, None
+                        if self.blobs:
+                            digest = hasher.digest(path)
+                            rewrite_path = self.blobs.adopt(path, digest)
+                            on_rewritten = functools.partial(self.blobs.relink, digest)
+                        self.storage.record(path)
+                    BYTES_DOWNLOADED.inc(amount=os.path.getsize(path))
+                    if self.faststart:
+                        self.faststart.submit(rewrite_path, on_rewritten, name=path)
+                    return path
+
+                video_id = info.get('id') or video_url
+                file_path = self.flights.run((video_id, fmt), transfer, progress_callback)
+
+            self.result_cache.put(video_url, video_id, file_path, fmt)
+            DOWNLOADS.inc("downloaded")
+            mark("first_download")
+            return file_path
+        except Exception as e:
+            if from_cache:
+                # The cached media URLs may have expired; extract fresh on the next attempt
+                self.metadata_cache.discard(video_url)
+            kind = classify(e)
+            DOWNLOADS.inc(f"failed_{kind}")
+            DOWNLOAD_ERRORS.inc(error_class(e))
+            logging.error(f"Failed to download {video_url} ({kind}): {e}")
+            raise DownloadFailed(str(e), kind, log.lines(), retry_after(e)) from e
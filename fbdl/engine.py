@@ -0,0 +1,290 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+from fbdl.download_queue import DownloadQueue, QueueItem
+from fbdl.failures import LOCAL, PERMANENT, DownloadFailed
+from fbdl.metrics import RETRIES
+from fbdl.retry import CircuitBreaker, RetryPolicy
+
+# -----------------------------
+# Background download engine
+# -----------------------------
+# One engine per server process owns every yt_dlp job. Queue items are
+# fbdl.download_queue.QueueItem records; worker threads only ever touch the
+# item they were given, so the Streamlit script can poll the same records
+# from session_state on every rerun.
+#
+# Scheduling:
+# - at most max_workers jobs run at once across all sessions;
+# - each session has its own FIFO and workers pick sessions round-robin, so
+#   one user pasting 200 URLs cannot starve everyone else;
+# - job starts against the same host are spaced at least 1/host_rate seconds
+#   apart;
+# - items that failed permanently (see fbdl.failures) are never rescheduled;
+# - local failures (a full download folder) are settled at once and never
+#   touch the host's breaker;
+# - with a RetryPolicy, retryable failures go back on the schedule after a
+#   jittered backoff without holding a worker, and with a CircuitBreaker a
+#   host that keeps failing (or sends Retry-After) is paused, then probed by
+#   a single job before traffic resumes (see fbdl.retry).
+DEFAULT_SESSION = "default"
+_WAIT_SAMPLES = 500
+
+
+class _Job:
+    __slots__ = ("item", "download_fn", "future", "host", "session", "attempt", "probe", "submitted_at")
+
+    def __init__(self, item, download_fn, session):
+        self.item = item
+        self.download_fn = download_fn
+        self.future = Future()
+        self.host = (urlparse(item.url).hostname or "").lower()
+        self.session = session
+        self.attempt = 0
+        self.probe = False
+        self.submitted_at = time.monotonic()
+
+
+class DownloadEngine:
+    """Shared download scheduler with a global concurrency cap and per-session fairness."""
+
+    def __init__(self, max_workers: int = 4, host_rate: float = 0.0, retry: RetryPolicy = None,
+                 breaker: CircuitBreaker = None):
+        self.max_workers = max(1, max_workers)
+        self.host_interval = 1.0 / host_rate if host_rate > 0 else 0.0
+        self.retry = retry or RetryPolicy(max_attempts=1)
+        self.breaker = breaker or CircuitBreaker(threshold=0)
+        self._cond = threading.Condition()
+        self._sessions = OrderedDict()
+        self._host_next_start = {}
+        # (ready_at, seq, job) for jobs backing off before their next attempt
+        self._delayed = []
+        self._seq = itertools.count()
+        # Hosts whose breaker tripped and that currently have their one probe job running
+        self._probes = set()
+        self._running = 0
+        self._waits = deque(maxlen=_WAIT_SAMPLES)
+        self._started = 0
+        self._shutdown = False
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"fbdl-download-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, item: QueueItem, download_fn, session: str = DEFAULT_SESSION) -> Future:
+        """Schedules a queue item; `download_fn(url, progress_callback)` returns a path or None.
+
+        A permanently failed item is not run again; its future resolves to "failed" at once.
+        """
+        if item.status == "failed" and not item.retryable:
+            future = Future()
+            future.set_result(item.status)
+            return future
+        item.progress = 0.0
+        item.speed = item.eta = None
+        item.attempts = 0
+        item.status = "queued"
+        job = _Job(item, download_fn, session)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("DownloadEngine has been shut down")
+            self._sessions.setdefault(session, deque()).append(job)
+            self._cond.notify()
+        return job.future
+
+    def submit_waiting(self, queue: DownloadQueue, download_fn, session: str = DEFAULT_SESSION) -> int:
+        """Schedules every "waiting" item in the queue and returns how many were submitted."""
+        waiting = queue.with_status("waiting")
+        for item in waiting:
+            self.submit(item, download_fn, session)
+        return len(waiting)
+
+    def cancel_session(self, session: str) -> int:
+        """Drops a session's jobs that have not started yet and returns how many."""
+        with self._cond:
+            jobs = list(self._sessions.pop(session, ()))
+            delayed = [entry for entry in self._delayed if entry[2].session == session]
+            if delayed:
+                self._delayed = [entry for entry in self._delayed if entry[2].session != session]
+                heapq.heapify(self._delayed)
+                jobs.extend(entry[2] for entry in delayed)
+        for job in jobs:
+            job.item.status = "waiting"
+            self._drop(job)
+        return len(jobs)
+
+    def metrics(self) -> dict:
+        """Queue depth, running jobs and recent submit-to-start wait times (seconds)."""
+        with self._cond:
+            depth = {session: len(jobs) for session, jobs in self._sessions.items()}
+            waits = sorted(self._waits)
+            running = self._running
+            started = self._started
+            retrying = len(self._delayed)
+        return {
+            "max_workers": self.max_workers,
+            "running": running,
+            "queued": sum(depth.values()),
+            "retrying": retrying,
+            "paused_hosts": self.breaker.open_hosts(),
+            "sessions": len(depth),
+            "queued_by_session": depth,
+            "started_total": started,
+            "wait_avg_s": sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95_s": waits[int(len(waits) * 0.95)] if waits else 0.0,
+        }
+
+    def _next_job(self):
+        """Blocks until a job may start; round-robins over sessions. Returns None on shutdown."""
+        with self._cond:
+            while True:
+                if self._shutdown:
+                    return None
+                now = time.monotonic()
+                # Backed-off jobs rejoin the end of their session's line when due
+                while self._delayed and self._delayed[0][0] <= now:
+                    job = heapq.heappop(self._delayed)[2]
+                    job.submitted_at = now
+                    self._sessions.setdefault(job.session, deque()).append(job)
+                earliest = self._delayed[0][0] if self._delayed else None
+                for session, jobs in self._sessions.items():
+                    job = jobs[0]
+                    ready_at = self._host_next_start.get(job.host, 0.0)
+                    if ready_at > now:
+                        earliest = ready_at if earliest is None else min(earliest, ready_at)
+                        continue
+                    if self.breaker.tripped(job.host):
+                        if job.host in self._probes:
+                            continue
+                        self._probes.add(job.host)
+                        job.probe = True
+                    jobs.popleft()
+                    if jobs:
+                        # Served sessions go to the back of the line
+                        self._sessions.move_to_end(session)
+                    else:
+                        del self._sessions[session]
+                    if self.host_interval:
+                        self._host_next_start[job.host] = now + self.host_interval
+                    self._running += 1
+                    self._started += 1
+                    self._waits.append(now - job.submitted_at)
+                    return job
+                self._cond.wait(None if earliest is None else earliest - now)
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            failure = None
+            try:
+                if job.attempt or job.future.set_running_or_notify_cancel():
+                    failure = self._run(job.item, job.download_fn)
+                    if not self._finish(job, failure):
+                        job.future.set_result(job.item.status)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    if job.probe:
+                        job.probe = False
+                        self._probes.discard(job.host)
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _drop(job):
+        # A job waiting to be retried already has a running future that cannot be cancelled
+        if not job.future.cancel():
+            job.future.set_result(job.item.status)
+
+    def _finish(self, job, failure) -> bool:
+        """Settles a finished attempt; returns True if the job was put back for another one."""
+        item = job.item
+        if failure is not None and failure.kind == LOCAL:
+            # Our own disk is full, not the host's fault: leave its breaker alone and
+            # leave the retry to the user
+            self._settle(item, failure)
+            return False
+        if failure is None or not failure.retryable:
+            self.breaker.record_success(job.host)
+            self._settle(item, failure)
+            return False
+
+        paused_until = self.breaker.record_failure(job.host, failure.retry_after)
+        job.attempt += 1
+        with self._cond:
+            if paused_until:
+                self._host_next_start[job.host] = max(self._host_next_start.get(job.host, 0.0), paused_until)
+            if self._shutdown or not self.retry.should_retry(job.attempt):
+                self._settle(item, failure)
+                return False
+            delay = self.retry.delay(job.attempt, failure.retry_after)
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), job))
+            item.attempts = job.attempt
+            item.progress = 0.0
+            item.speed = item.eta = None
+            item.status = "queued"
+        RETRIES.inc()
+        logging.info(f"Retrying {item.url} in {delay:.1f}s (attempt {job.attempt + 1}/{self.retry.max_attempts})")
+        return True
+
+    @staticmethod
+    def _settle(item: QueueItem, failure):
+        if failure is None:
+            item.progress = 1.0
+            item.status = "success"
+        else:
+            item.status = "failed"
+
+    def _run(self, item: QueueItem, download_fn):
+        """Runs one attempt; returns None on success, else the DownloadFailed describing it."""
+        item.status = "downloading"
+
+        def progress_callback(p, speed=None, eta=None):
+            item.progress = p
+            item.speed = speed
+            item.eta = eta
+
+        item.error = None
+        item.retryable = True
+        item.log = ()
+        try:
+            file_path = download_fn(item.url, progress_callback)
+        except DownloadFailed as e:
+            item.error = str(e)
+            item.retryable = e.retryable
+            item.log = tuple(e.log)
+            return e
+        except Exception as e:
+            logging.error(f"Download worker crashed for {item.url}: {e}")
+            item.error = str(e)
+            # Not a classified failure, so never retried automatically
+            return DownloadFailed(str(e), kind=PERMANENT)
+
+        if not file_path:
+            item.error = "No file was downloaded"
+            return DownloadFailed(item.error, kind=PERMANENT)
+        item.file_path = file_path
+        return None
+
+    def shutdown(self, wait: bool = False):
+        with self._cond:
+            self._shutdown = True
+            pending = [job for jobs in self._sessions.values() for job in jobs]
+            pending.extend(entry[2] for entry in self._delayed)
+            self._sessions.clear()
+            self._delayed = []
+            self._cond.notify_all()
+        for job in pending:
+            self._drop(job)
+        if wait:
+            for worker in self._workers:
+                worker.join()
@@ -0,0 +1,160 @@
+import logging
+import re
+from email.utils import parsedate_to_datetime
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from fbdl.storage import StorageFull, TooLarge
+
+# -----------------------------
+# yt_dlp log capture and failure classification
+# -----------------------------
+# Pooled YoutubeDL instances share one YDLLogger; while a download runs, the
+# thread it runs on has a JobLog "activated", and everything yt_dlp logs from
+# that thread lands in the job's bounded ring buffer instead of being thrown
+# away. Warnings and errors are always kept; chatty debug lines are sampled.
+#
+# When a download fails, classify() decides whether trying again can help.
+# Permanent failures (private or removed videos, unsupported links, nothing
+# matching the requested format or size cap, a file bigger than the whole
+# storage budget) are not rescheduled. Local failures (the download folder is
+# full) say nothing about the host: they are not retried automatically and
+# do not count towards its circuit breaker, but the user may retry them once
+# space has been freed.
+RETRYABLE = "retryable"
+PERMANENT = "permanent"
+LOCAL = "local"
+
+_PERMANENT_PATTERNS = re.compile(
+    r"private|unavailable|has been removed|been deleted|content isn.t available|not available"
+    r"|login required|log in|logged-in|unsupported url|not a valid url|no video formats"
+    r"|requested format is not available|no file written",
+    re.IGNORECASE,
+)
+# Checked first: transient wording that would otherwise match "unavailable"
+_RETRYABLE_PATTERNS = re.compile(r"temporar|service unavailable|timed out|try again|rate.limit", re.IGNORECASE)
+_PERMANENT_HTTP_STATUSES = {400, 404, 410, 451}
+
+_active = threading.local()
+
+
+class JobLog:
+    """Ring buffer of (timestamp, level, message) records for one download."""
+
+    def __init__(self, capacity: int = 100, debug_keep_first: int = 20, debug_every: int = 10):
+        self.records = deque(maxlen=capacity)
+        self.debug_keep_first = debug_keep_first
+        self.debug_every = debug_every
+        self._debug_seen = 0
+
+    def add(self, level: str, msg: str):
+        if level == "debug":
+            self._debug_seen += 1
+            if self._debug_seen > self.debug_keep_first and self._debug_seen % self.debug_every:
+                return
+        self.records.append((time.time(), level, msg))
+
+    def lines(self) -> list:
+        return [f"{level.upper()}: {msg}" for _, level, msg in self.records]
+
+
+@contextmanager
+def capture(log: JobLog = None):
+    """Routes yt_dlp log output from the current thread into `log` for the duration."""
+    log = log or JobLog()
+    previous = getattr(_active, "log", None)
+    _active.log = log
+    try:
+        yield log
+    finally:
+        _active.log = previous
+
+
+class YDLLogger:
+    """yt_dlp `logger` that writes into the current thread's JobLog."""
+
+    def _emit(self, level, msg):
+        log = getattr(_active, "log", None)
+        if log is not None:
+            log.add(level, msg)
+        elif level == "error":
+            logging.debug(f"yt_dlp: {msg}")
+
+    def debug(self, msg):
+        self._emit("debug", msg)
+
+    def info(self, msg):
+        self._emit("debug", msg)
+
+    def warning(self, msg):
+        self._emit("warning", msg)
+
+    def error(self, msg):
+        self._emit("error", msg)
+
+
+class DownloadFailed(Exception):
+    """A download that did not produce a file, with its classification and captured log."""
+
+    def __init__(self, message: str, kind: str = RETRYABLE, log: list = (), retry_after: float = None):
+        super().__init__(message)
+        self.kind = kind
+        self.log = list(log)
+        # Seconds the server asked us to wait (HTTP Retry-After), if any
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        """Whether trying again may help (automatically for RETRYABLE, by the user for LOCAL)."""
+        return self.kind != PERMANENT
+
+
+def _candidates(exc):
+    """The exception itself and the ones yt_dlp wrapped inside it."""
+    yield exc
+    yield getattr(exc, "cause", None)
+    yield (getattr(exc, "exc_info", None) or (None, None))[1]
+
+
+def _http_status(exc):
+    for candidate in _candidates(exc):
+        status = getattr(candidate, "status", None) or getattr(candidate, "code", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def retry_after(exc: BaseException):
+    """Seconds from an HTTP Retry-After header attached to the failure, or None."""
+    for candidate in _candidates(exc):
+        headers = getattr(getattr(candidate, "response", None), "headers", None) or getattr(candidate, "headers", None)
+        value = headers.get("Retry-After") if headers is not None else None
+        if not value:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def classify(exc: BaseException) -> str:
+    """RETRYABLE, PERMANENT or LOCAL for an exception raised while downloading."""
+    for candidate in _candidates(exc):
+        if isinstance(candidate, TooLarge):
+            return PERMANENT
+        if isinstance(candidate, StorageFull):
+            return LOCAL
+    status = _http_status(exc)
+    if status is not None:
+        return PERMANENT if status in _PERMANENT_HTTP_STATUSES else RETRYABLE
+    message = str(exc)
+    if not _RETRYABLE_PATTERNS.search(message) and _PERMANENT_PATTERNS.search(message):
+        return PERMANENT
+    return RETRYABLE
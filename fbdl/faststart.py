@@ -0,0 +1,211 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fbdl.metrics import STAGE_SECONDS
+
+# -----------------------------
+# MP4 "faststart" rewrite
+# -----------------------------
+# Progressive MP4s often carry the moov atom (the index) after the media data,
+# so a player cannot start until it has fetched the end of the file. This
+# moves moov in front of the first mdat and shifts every chunk offset in
+# stco/co64 by the size it moved, in pure Python (only moov is read into
+# memory; media data is copied in chunks). If a shifted offset no longer fits
+# 32 bits, stco tables are upgraded to co64. Fragmented files (moof) and
+# files that are already faststart are left alone.
+#
+# FaststartPool runs the rewrite in worker processes after a download; the
+# new file replaces the old one atomically, so readers never see a partial
+# file.
+MP4_EXTENSIONS = (".mp4", ".m4v", ".m4a", ".mov")
+# Containers on the path from moov down to the chunk offset tables
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+_COPY_CHUNK = 1024 * 1024
+
+
+class FaststartError(Exception):
+    """The file is not an MP4 this rewrite understands."""
+
+
+def _top_level_atoms(f, file_size):
+    """Yields (type, offset, size) for every top-level atom."""
+    offset = 0
+    while offset < file_size:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            raise FaststartError(f"Truncated atom header at {offset}")
+        size, kind = struct.unpack(">I4s", header)
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+        elif size == 0:
+            size = file_size - offset
+        if size < 8 or offset + size > file_size:
+            raise FaststartError(f"Bad size for {kind!r} atom at {offset}")
+        yield kind, offset, size
+        offset += size
+
+
+def _children(data, start, end):
+    pos = start
+    while pos < end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise FaststartError(f"Bad size for {kind!r} atom inside moov")
+        yield kind, pos, header, size
+        pos += size
+
+
+def _rebuild(data, start, end, shift, to_co64):
+    """Re-serializes atoms in data[start:end] with chunk offsets shifted by shift(offset)."""
+    out = bytearray()
+    for kind, pos, header, size in _children(data, start, end):
+        body_start = pos + header
+        body_end = pos + size
+        if kind in _CONTAINERS:
+            body = _rebuild(data, body_start, body_end, shift, to_co64)
+        elif kind in (b"stco", b"co64"):
+            version_flags, count = struct.unpack_from(">II", data, body_start)
+            width = 4 if kind == b"stco" else 8
+            offsets = struct.unpack_from(f">{count}{'I' if width == 4 else 'Q'}", data, body_start + 8)
+            shifted = [shift(o) for o in offsets]
+            if kind == b"stco" and to_co64:
+                kind = b"co64"
+                width = 8
+            if width == 4 and shifted and max(shifted) > 0xFFFFFFFF:
+                raise OverflowError("stco offset overflow")
+            body = struct.pack(">II", version_flags, count) + struct.pack(
+                f">{count}{'I' if width == 4 else 'Q'}", *shifted
+            )
+        else:
+            body = data[body_start:body_end]
+        total = 8 + len(body)
+        if total > 0xFFFFFFFF:
+            out += struct.pack(">I4sQ", 1, kind, total + 8) + body
+        else:
+            out += struct.pack(">I4s", total, kind) + body
+    return bytes(out)
+
+
+def faststart(path: str) -> bool:
+    """Rewrites `path` in place with moov before mdat. Returns False if nothing had to change."""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        atoms = list(_top_level_atoms(f, file_size))
+        kinds = [kind for kind, _, _ in atoms]
+        if b"moov" not in kinds or b"mdat" not in kinds or b"moof" in kinds:
+            return False
+        moov_index = kinds.index(b"moov")
+        first_mdat = kinds.index(b"mdat")
+        if moov_index < first_mdat:
+            return False
+        _, moov_offset, moov_size = atoms[moov_index]
+        f.seek(moov_offset)
+        moov = f.read(moov_size)
+
+    def build(to_co64):
+        # First pass to learn the new moov size, second with the real shift
+        size = len(_rebuild(moov, 0, len(moov), lambda o: o, to_co64))
+
+        def shift(offset):
+            # Data before the old moov moves down by the new moov's size; data after it
+            # only by how much moov grew
+            return offset + size if offset < moov_offset else offset + size - moov_size
+
+        return _rebuild(moov, 0, len(moov), shift, to_co64)
+
+    try:
+        new_moov = build(False)
+    except OverflowError:
+        new_moov = build(True)
+
+    insert_at = atoms[first_mdat][1]
+    tmp_path = f"{path}.faststart"
+    try:
+        with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+            _copy_range(src, dst, 0, insert_at)
+            dst.write(new_moov)
+            for kind, offset, size in atoms[first_mdat:]:
+                if kind != b"moov":
+                    _copy_range(src, dst, offset, size)
+        shutil.copystat(path, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return True
+
+
+def _copy_range(src, dst, offset, length):
+    src.seek(offset)
+    while length > 0:
+        chunk = src.read(min(_COPY_CHUNK, length))
+        if not chunk:
+            raise FaststartError("File shrank while copying")
+        dst.write(chunk)
+        length -= len(chunk)
+
+
+def _faststart_job(path):
+    start = time.perf_counter()
+    try:
+        rewritten = faststart(path)
+    except FaststartError:
+        # Not an MP4 we can parse; serve it as downloaded
+        rewritten = False
+    return rewritten, time.perf_counter() - start
+
+
+class FaststartPool:
+    """Runs faststart() on finished downloads in worker processes."""
+
+    def __init__(self, max_workers: int = 1):
+        # spawn: forking a process that runs Streamlit and download threads is unsafe
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def submit(self, path: str, on_rewritten=None, name: str = None):
+        """Queues an MP4 for rewriting; returns the Future (None for other files).
+
+        `on_rewritten()` is called in this process after the file was replaced.
+        `name` is checked for an MP4 extension instead of `path` (blobs have none).
+        """
+        if not (name or path).lower().endswith(MP4_EXTENSIONS):
+            return None
+        with self._lock:
+            future = self._pending.get(path)
+            if future is not None:
+                return future
+            future = self._pending[path] = self._executor.submit(_faststart_job, path)
+        # Outside the lock: the callback runs right away if the job already finished
+        future.add_done_callback(lambda f: self._done(path, f, on_rewritten))
+        return future
+
+    def _done(self, path, future, on_rewritten=None):
+        with self._lock:
+            self._pending.pop(path, None)
+        if future.cancelled():
+            return
+        try:
+            rewritten, seconds = future.result()
+            STAGE_SECONDS.observe(seconds, "faststart")
+            if rewritten and on_rewritten:
+                on_rewritten()
+        except Exception as e:
+            logging.error(f"Faststart rewrite failed for {path}: {e}")
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,82 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+
+# -----------------------------
+# Contact-form feedback store
+# -----------------------------
+# Append-only SQLite table in WAL mode: a submit is one INSERT, concurrent
+# sessions (and processes) never overwrite each other, and the page only
+# asks for the latest message per email address, newest first. Older
+# messages from the same address stay in the table but are not shown.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    name        TEXT NOT NULL,
+    email       TEXT NOT NULL,
+    message     TEXT NOT NULL,
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS feedback_email ON feedback (email, created_at);
+CREATE INDEX IF NOT EXISTS feedback_created ON feedback (created_at);
+"""
+
+
+class FeedbackStore:
+    """Append-only feedback messages with a cheap "latest N" query."""
+
+    def __init__(self, db_path: str, legacy_csv: str = None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        if legacy_csv:
+            self.import_csv(legacy_csv)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def add(self, name: str, email: str, message: str):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO feedback (name, email, message, created_at) VALUES (?, ?, ?, ?)",
+                (name, email, message, time.time()),
+            )
+
+    def latest(self, limit: int = 50) -> list:
+        """Newest message per email address, newest first, as name/email/message dicts."""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT name, email, message FROM feedback AS f
+                WHERE f.id = (SELECT MAX(id) FROM feedback WHERE email = f.email)
+                ORDER BY f.created_at DESC, f.id DESC
+                LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+        return [{"name": name, "email": email, "message": message} for name, email, message in rows]
+
+    def import_csv(self, csv_path: str) -> int:
+        """One-time import of the old name,email,message CSV into an empty store."""
+        if not os.path.exists(csv_path):
+            return 0
+        with self._lock, self._connect() as conn:
+            if conn.execute("SELECT 1 FROM feedback LIMIT 1").fetchone():
+                return 0
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                rows = [
+                    (r.get("name") or "", r.get("email") or "", r.get("message") or "")
+                    for r in csv.DictReader(f)
+                ]
+            # Keep the file's order: later rows were newer
+            now = time.time()
+            conn.executemany(
+                "INSERT INTO feedback (name, email, message, created_at) VALUES (?, ?, ?, ?)",
+                [(name, email, message, now + i * 1e-6) for i, (name, email, message) in enumerate(rows)],
+            )
+        return len(rows)
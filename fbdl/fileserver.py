@@ -0,0 +1,151 @@
+import mimetypes
+import os
+import re
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+
+from fbdl.metrics import REGISTRY
+
+# -----------------------------
+# Small static file route with HTTP range support
+# -----------------------------
+# Files are never read into Python memory: the kernel copies them straight
+# to the socket with sendfile(). Only paths explicitly published through
+# FileServer.publish() are reachable, each behind an unguessable token.
+# /metrics serves the process's fbdl.metrics registry for Prometheus.
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class _FileHandler(BaseHTTPRequestHandler):
+    server_version = "fbdl-files"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        parts = self.path.split("?", 1)[0].strip("/").split("/")
+        if parts == ["metrics"]:
+            self._send_metrics(send_body)
+            return
+        if len(parts) < 2 or parts[0] != "files":
+            self.send_error(404)
+            return
+        entry = self.server.registry.lookup(unquote(parts[1]))
+        if entry is None or not os.path.exists(entry[0]):
+            self.send_error(404)
+            return
+        path, filename = entry
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        status = 200
+        range_header = self.headers.get("Range")
+        if range_header:
+            match = _RANGE_RE.match(range_header.strip())
+            if not match or (not match.group(1) and not match.group(2)):
+                self._send_unsatisfiable(size)
+                return
+            if match.group(1):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(int(match.group(2)), size - 1)
+            else:
+                start = max(0, size - int(match.group(2)))
+            if start > end or start >= size:
+                self._send_unsatisfiable(size)
+                return
+            status = 206
+
+        length = end - start + 1 if size else 0
+        mime_type, _ = mimetypes.guess_type(filename)
+        self.send_response(status)
+        self.send_header("Content-Type", mime_type or "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(filename)}")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        if send_body and length:
+            with open(path, "rb") as f:
+                try:
+                    self.connection.sendfile(f, offset=start, count=length)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+    def _send_metrics(self, send_body):
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_unsatisfiable(self, size):
+        self.send_response(416)
+        self.send_header("Content-Range", f"bytes */{size}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class _Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_token = {}
+        self._by_path = {}
+
+    def publish(self, path, filename):
+        with self._lock:
+            token = self._by_path.get(path)
+            if token is None:
+                token = secrets.token_urlsafe(16)
+                self._by_path[path] = token
+            self._by_token[token] = (path, filename)
+            return token
+
+    def lookup(self, token):
+        with self._lock:
+            return self._by_token.get(token)
+
+    def unpublish(self, path):
+        with self._lock:
+            token = self._by_path.pop(path, None)
+            if token is not None:
+                self._by_token.pop(token, None)
+
+
+class FileServer:
+    """Serves published files over HTTP from a daemon thread."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, public_url: str = ""):
+        self.registry = _Registry()
+        self._httpd = ThreadingHTTPServer((host, port), _FileHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.registry = self.registry
+        self.port = self._httpd.server_address[1]
+        self.public_url = (public_url or f"http://localhost:{self.port}").rstrip("/")
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fbdl-files", daemon=True)
+        self._thread.start()
+
+    def publish(self, path: str, filename: str = None) -> str:
+        """Makes `path` downloadable and returns its URL."""
+        filename = filename or os.path.basename(path)
+        token = self.registry.publish(os.path.abspath(path), filename)
+        return f"{self.public_url}/files/{token}/{quote(filename)}"
+
+    def unpublish(self, path: str):
+        self.registry.unpublish(os.path.abspath(path))
+
+    def shutdown(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,38 @@
+# -----------------------------
+# Quality presets
+# -----------------------------
+# Each preset maps to a yt_dlp format expression. Facebook serves progressive
+# (audio+video) MP4s up to HD plus separate DASH streams; the expressions
+# prefer progressive files so no ffmpeg merge is needed, and fall back to the
+# nearest stream that exists.
+PRESETS = {
+    "best": ("Best available", "best"),
+    "720p": ("720p", "best[height<=720]/best"),
+    "360p": ("360p (phone size)", "best[height<=360]/worst[vcodec!=none]/worst"),
+    "audio": ("Audio only", "bestaudio[ext=m4a]/bestaudio/worst"),
+}
+DEFAULT_PRESET = "best"
+
+
+def format_spec(preset: str = DEFAULT_PRESET, max_filesize_mb: int = 0) -> str:
+    """Returns the yt_dlp `format` expression for a preset and optional size cap."""
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown quality preset: {preset!r} (choose from {', '.join(PRESETS)})")
+    spec = PRESETS[preset][1]
+    if not max_filesize_mb:
+        return spec
+    # Size filters use "<?" so formats with unknown size are still eligible;
+    # the downloader also passes max_filesize so those are cut off mid-transfer
+    cap = f"[filesize<?{max_filesize_mb}M][filesize_approx<?{max_filesize_mb}M]"
+    return "/".join(f"{alternative}{cap}" for alternative in spec.split("/"))
+
+
+def format_key(preset: str = DEFAULT_PRESET, max_filesize_mb: int = 0) -> str:
+    """Cache/single-flight key for a preset; "best" keeps the historical key."""
+    return f"{preset}<{max_filesize_mb}M" if max_filesize_mb else preset
+
+
+def filename_suffix(preset: str = DEFAULT_PRESET, max_filesize_mb: int = 0) -> str:
+    """Suffix that keeps different presets of one video from overwriting each other."""
+    suffix = "" if preset == DEFAULT_PRESET else f"_{preset}"
+    return f"{suffix}_max{max_filesize_mb}M" if max_filesize_mb else suffix
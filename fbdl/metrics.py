@@ -0,0 +1,198 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# -----------------------------
+# In-process metrics (Prometheus text format)
+# -----------------------------
+# A deliberately small counter/histogram registry so the pipeline can be
+# instrumented without a client library. Every process has one REGISTRY;
+# FileServer exposes it at /metrics and the CLI can write it to a file.
+# Label values are kept low-cardinality (stage names, cache names, error
+# classes), never URLs.
+STAGE_BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield self.name, self.labels, label_values, value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"/".join(map(str, k)) or "total": v for k, v in sorted(self._values.items())}
+
+
+class Histogram:
+    """Cumulative-bucket histogram with sum and count, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        le_labels = self.labels + ("le",)
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                cumulative += n
+                yield f"{self.name}_bucket", le_labels, label_values + (bound,), cumulative
+            yield f"{self.name}_sum", self.labels, label_values, total
+            yield f"{self.name}_count", self.labels, label_values, count
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "/".join(map(str, k)) or "total": {
+                    "count": count,
+                    "sum_s": total,
+                    "avg_s": total / count if count else 0.0,
+                }
+                for k, (_, total, count) in sorted(self._values.items())
+            }
+
+
+class Gauge(Counter):
+    """Value that can go up and down, optionally split by labels."""
+
+    kind = "gauge"
+
+    def set(self, value: float, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels=()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels=(), buckets=STAGE_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, values, value in metric.samples():
+                lines.append(f"{name}{_label_str(labels, values)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """JSON-friendly view, plus hit rates for every cache."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        data = {name: metric.snapshot() for name, metric in metrics.items()}
+        lookups = metrics.get("fbdl_cache_lookups_total")
+        if lookups is not None:
+            rates = {}
+            for _, _, (cache, result), value in lookups.samples():
+                hits, total = rates.get(cache, (0, 0))
+                rates[cache] = (hits + (value if result == "hit" else 0), total + value)
+            data["cache_hit_rate"] = {cache: hits / total for cache, (hits, total) in rates.items() if total}
+        return data
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "fbdl_stage_seconds",
+    "Time spent per pipeline stage (validate, metadata, transfer, finalize, zip, prepare)",
+    labels=("stage",),
+)
+DOWNLOADS = REGISTRY.counter("fbdl_downloads_total", "Finished download attempts", labels=("outcome",))
+DOWNLOAD_ERRORS = REGISTRY.counter("fbdl_download_errors_total", "Failed downloads by error class", labels=("error",))
+CACHE_LOOKUPS = REGISTRY.counter("fbdl_cache_lookups_total", "Cache lookups by cache and result", labels=("cache", "result"))
+RETRIES = REGISTRY.counter("fbdl_retries_total", "Downloads put back on the schedule after a retryable failure")
+BYTES_DOWNLOADED = REGISTRY.counter("fbdl_downloaded_bytes_total", "Bytes written by completed transfers")
+STARTUP_SECONDS = REGISTRY.gauge("fbdl_startup_seconds", "Seconds from fbdl startup to each startup milestone (see fbdl.startup)",
+                                 labels=("phase",))
+
+
+def stage(name: str):
+    """Context manager timing one pipeline stage: `with stage("transfer"): ...`."""
+    return STAGE_SECONDS.time(name)
+
+
+def cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.inc(cache, "hit" if hit else "miss")
+
+
+def error_class(exc: BaseException) -> str:
+    """Names the underlying failure; yt_dlp's DownloadError wraps the original exception."""
+    exc_info = getattr(exc, "exc_info", None)
+    if exc_info and exc_info[1] is not None:
+        exc = exc_info[1]
+    return type(exc).__name__
@@ -0,0 +1,81 @@
+import time
+
+# -----------------------------
+# Throttled progress channel
+# -----------------------------
+# yt_dlp calls its progress hooks for every chunk written, often hundreds of
+# times a second. ThrottledProgress turns those hook dicts into at most a few
+# callback(fraction, speed=..., eta=...) calls per second, coalescing small
+# steps, and derives throughput and ETA from downloaded_bytes over time.
+class ThrottledProgress:
+    """yt_dlp progress hook that forwards coalesced updates to `callback`."""
+
+    def __init__(self, callback, min_interval: float = 0.25, min_delta: float = 0.01, max_interval: float = 2.0,
+                 clock=time.monotonic):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self.max_interval = max_interval
+        self.clock = clock
+        self._start = None
+        self._start_bytes = 0
+        self._last_time = None
+        self._last_fraction = -1.0
+
+    def __call__(self, d):
+        if d['status'] == 'finished':
+            self._emit(1.0, None, 0)
+            return
+        if d['status'] != 'downloading':
+            return
+
+        now = self.clock()
+        downloaded_bytes = d.get('downloaded_bytes') or 0
+        if self._start is None:
+            # Resumed downloads start part-way; measure throughput from here
+            self._start, self._start_bytes = now, downloaded_bytes
+            self._last_time = now - self.min_interval
+
+        since_last = now - self._last_time
+        if since_last < self.min_interval:
+            return
+
+        total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate')
+        fraction = min(downloaded_bytes / total_bytes, 1.0) if total_bytes else self._last_fraction
+        if fraction - self._last_fraction < self.min_delta and since_last < self.max_interval:
+            return
+
+        elapsed = now - self._start
+        speed = (downloaded_bytes - self._start_bytes) / elapsed if elapsed > 0 else None
+        eta = (total_bytes - downloaded_bytes) / speed if speed and total_bytes else None
+        self._last_time = now
+        self._emit(max(fraction, 0.0), speed, eta)
+
+    def _emit(self, fraction, speed, eta):
+        self._last_fraction = fraction
+        self.callback(fraction, speed=speed, eta=eta)
+
+
+def format_size(num_bytes) -> str:
+    for unit in ("B", "KB", "MB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+
+def format_rate(bytes_per_s) -> str:
+    if not bytes_per_s:
+        return ""
+    return f"{format_size(bytes_per_s)}/s"
+
+
+def format_eta(seconds) -> str:
+    if seconds is None:
+        return ""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds}s"
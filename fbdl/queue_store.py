@@ -0,0 +1,86 @@
+import json
+import os
+import re
+import secrets
+import time
+
+from fbdl.download_queue import DownloadQueue
+
+# -----------------------------
+# Persisted queue state
+# -----------------------------
+# A queue is saved as a small JSON file named after an opaque token, so a
+# browser refresh, a Streamlit rerun or a worker restart can pick the batch up
+# again. Items that were in flight are put back to "waiting"; yt_dlp keeps
+# their .part files and resumes them with HTTP range requests.
+IN_FLIGHT_STATUSES = ("queued", "downloading")
+_TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+class QueueStore:
+    """Saves and restores download queues under a state directory."""
+
+    def __init__(self, state_dir, max_age: float = 7 * 24 * 3600):
+        self.state_dir = str(state_dir)
+        self.max_age = max_age
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    @staticmethod
+    def new_token() -> str:
+        return secrets.token_urlsafe(12)
+
+    @staticmethod
+    def is_valid_token(token: str) -> bool:
+        """Tokens are 8-64 letters, digits, '-' or '_' (they become file names)."""
+        return bool(_TOKEN_RE.match(token or ""))
+
+    def _path(self, token: str) -> str:
+        if not self.is_valid_token(token):
+            raise ValueError(f"Invalid queue token: {token!r}")
+        return os.path.join(self.state_dir, f"queue_{token}.json")
+
+    def save(self, token: str, queue: DownloadQueue):
+        """Atomically writes the queue's durable fields."""
+        items = queue.to_records()
+        path = self._path(token)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": time.time(), "settings": queue.settings(), "items": items}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, token: str):
+        """Returns the saved DownloadQueue with in-flight items reset to "waiting", or None."""
+        try:
+            with open(self._path(token), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        records = []
+        for item in data.get("items", []):
+            status = item.get("status", "waiting")
+            file_path = item.get("file_path")
+            if status in IN_FLIGHT_STATUSES or (status == "success" and not (file_path and os.path.exists(file_path))):
+                status = "waiting"
+            records.append({
+                "url": item["url"],
+                "status": status,
+                "file_path": file_path if status == "success" else None,
+                "progress": 1.0 if status == "success" else 0.0,
+                "error": item.get("error") if status == "failed" else None,
+                "retryable": item.get("retryable", True),
+            })
+        return DownloadQueue.from_records(records, **data.get("settings", {}))
+
+    def delete(self, token: str):
+        try:
+            os.remove(self._path(token))
+        except (OSError, ValueError):
+            pass
+
+    def prune(self):
+        """Removes state files older than max_age."""
+        cutoff = time.time() - self.max_age
+        for name in os.listdir(self.state_dir):
+            path = os.path.join(self.state_dir, name)
+            if name.startswith("queue_") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
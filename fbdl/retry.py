@@ -0,0 +1,85 @@
+import random
+import threading
+import time
+
+# -----------------------------
+# Automatic retry policy and per-host circuit breaker
+# -----------------------------
+# Used by fbdl.engine.DownloadEngine. A retryable failure (see fbdl.failures)
+# puts the job back on the schedule after a "full jitter" exponential delay,
+# or after the server's Retry-After when that is longer. Separately, every
+# host has a breaker: after `threshold` retryable failures in a row nothing
+# new starts against that host for `cooldown` seconds (doubling each time it
+# trips again, up to max_cooldown); the first job after the pause is the
+# probe, and a success closes the breaker again.
+
+
+class RetryPolicy:
+    """How often and how long to wait before retrying a failed download."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 2.0, max_delay: float = 60.0, rng=None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._random = (rng or random.Random()).random
+
+    def should_retry(self, attempt: int) -> bool:
+        """`attempt` is the number of attempts already made (1 after the first failure)."""
+        return attempt < self.max_attempts
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = self._random() * ceiling
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker per host; open hosts report when they may be tried again."""
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0, max_cooldown: float = 600.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        # host -> [consecutive failures, times tripped, open until]
+        self._hosts = {}
+
+    def record_success(self, host: str):
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def record_failure(self, host: str, retry_after: float = None) -> float:
+        """Counts a retryable failure and returns the time until which the host is open (0 if closed)."""
+        if not self.threshold:
+            return 0.0
+        with self._lock:
+            state = self._hosts.setdefault(host, [0, 0, 0.0])
+            state[0] += 1
+            # A failed probe (any failure after a trip) re-opens at once
+            if state[0] >= self.threshold or state[1] or retry_after:
+                pause = min(self.max_cooldown, self.cooldown * 2 ** state[1])
+                if retry_after:
+                    pause = max(pause, retry_after)
+                state[0] = 0
+                state[1] += 1
+                state[2] = max(state[2], self._clock() + pause)
+            return state[2]
+
+    def tripped(self, host: str) -> bool:
+        """True from the first trip until the host's next success."""
+        with self._lock:
+            state = self._hosts.get(host)
+            return bool(state and state[1])
+
+    def open_until(self, host: str) -> float:
+        with self._lock:
+            state = self._hosts.get(host)
+            return state[2] if state else 0.0
+
+    def open_hosts(self) -> list:
+        now = self._clock()
+        with self._lock:
+            return sorted(host for host, state in self._hosts.items() if state[2] > now)
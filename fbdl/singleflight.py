@@ -0,0 +1,64 @@
+import threading
+
+# -----------------------------
+# Process-wide single-flight registry
+# -----------------------------
+# The first caller for a key (the leader) runs the work; callers arriving
+# while it is in flight wait for the same result instead of starting their
+# own copy. Progress reported by the leader is fanned out to every caller.
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.listeners = []
+        self.progress = (0.0, {})
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """De-duplicates concurrent calls that share a key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def run(self, key, fn, progress_callback=None):
+        """Calls `fn(report_progress)` once per in-flight key and returns its result to every caller."""
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[key] = _Flight()
+            if progress_callback:
+                flight.listeners.append(progress_callback)
+
+        if not is_leader:
+            if progress_callback:
+                fraction, stats = flight.progress
+                progress_callback(fraction, **stats)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        def report_progress(p, **stats):
+            flight.progress = (p, stats)
+            with self._lock:
+                listeners = list(flight.listeners)
+            for listener in listeners:
+                listener(p, **stats)
+
+        try:
+            flight.result = fn(report_progress)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
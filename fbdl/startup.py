@@ -0,0 +1,48 @@
+import logging
+import threading
+import time
+
+from fbdl.metrics import STARTUP_SECONDS
+
+# -----------------------------
+# Startup timeline
+# -----------------------------
+# Records when the process reached each startup milestone, in seconds since
+# this module was first imported (Home.py imports it before anything else):
+#   imports        - the page script finished its imports
+#   first_paint    - the first script run finished drawing
+#   prewarm        - yt_dlp, the Facebook extractor and a pooled YoutubeDL are ready
+#   first_download - the first download finished
+# Only the first occurrence of each mark counts. Marks are exported as the
+# fbdl_startup_seconds gauge (see fbdl.metrics) and returned by report().
+_t0 = time.perf_counter()
+_lock = threading.Lock()
+_marks = {}
+
+
+def mark(name: str) -> float:
+    """Records milestone `name` once and returns its offset in seconds."""
+    with _lock:
+        if name not in _marks:
+            _marks[name] = time.perf_counter() - _t0
+            STARTUP_SECONDS.set(_marks[name], name)
+        return _marks[name]
+
+
+def report() -> dict:
+    with _lock:
+        return dict(sorted(_marks.items(), key=lambda kv: kv[1]))
+
+
+def prewarm_in_background(downloader, **settings) -> threading.Thread:
+    """Imports yt_dlp and readies a pooled YoutubeDL on a daemon thread."""
+    def run():
+        try:
+            downloader.prewarm(**settings)
+            mark("prewarm")
+        except Exception as e:
+            logging.error(f"Prewarming the downloader failed: {e}")
+
+    thread = threading.Thread(target=run, name="fbdl-prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,183 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import Counter, defaultdict
+
+# -----------------------------
+# Download directory storage manager
+# -----------------------------
+# Keeps an in-memory index of the files in the download directory and holds
+# their total under a byte budget by deleting the least recently used ones.
+# Only regular, non-hidden files directly inside the directory are managed,
+# and nothing younger than min_age is ever evicted, so a batch that just
+# finished stays downloadable. Partial downloads (.part/.ytdl) count towards
+# usage but are only removed once they are older than max_age. Names that are
+# hard links to the same file (see fbdl.blobstore) are counted once, and
+# evicting one of them only frees space once the last name is gone.
+#
+# extra_dirs (the per-queue ZIPs) are managed exactly like the directory's
+# own files. link_dirs (the blob store) hold one more hard link per stored file. Their
+# bytes count towards usage, and when the last name of a file is evicted its
+# links there are removed with it, so the space really is freed.
+#
+# This is the only component that deletes downloads; fbdl.cache.ResultCache
+# just forgets entries whose file has gone.
+PARTIAL_SUFFIXES = (".part", ".ytdl")
+
+
+class StorageFull(Exception):
+    """Raised when a download cannot fit even after eviction."""
+
+
+class TooLarge(StorageFull):
+    """Raised when one download is bigger than the whole budget; no eviction can help."""
+
+
+class StorageManager:
+    """Byte-budgeted, LRU/age-evicting view of one download directory."""
+
+    def __init__(self, directory, max_bytes: int, max_age: float = 7 * 24 * 3600,
+                 min_age: float = 3600, min_free_bytes: int = 0, rescan_interval: float = 60, extra_dirs=(),
+                 link_dirs=()):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.min_age = min_age
+        self.min_free_bytes = min_free_bytes
+        self.rescan_interval = rescan_interval
+        self.extra_dirs = [str(d) for d in extra_dirs]
+        self.link_dirs = [str(d) for d in link_dirs]
+        self._lock = threading.Lock()
+        self._files = {}
+        # path -> (size, inode) for everything under link_dirs
+        self._links = {}
+        self._scanned_at = 0.0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _scan(self):
+        files = {}
+        for directory in [self.directory, *self.extra_dirs]:
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                files[entry.path] = (st.st_size, max(st.st_atime, st.st_mtime), (st.st_dev, st.st_ino))
+        links = {}
+        for root in self.link_dirs:
+            for dirpath, _, names in os.walk(root):
+                for name in names:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path, follow_symlinks=False)
+                    except OSError:
+                        continue
+                    links[path] = (st.st_size, (st.st_dev, st.st_ino))
+        self._files = files
+        self._links = links
+        self._scanned_at = time.monotonic()
+
+    def _refresh(self, force=False):
+        if force or time.monotonic() - self._scanned_at > self.rescan_interval:
+            self._scan()
+
+    def record(self, path):
+        """Adds or refreshes a file after it was written."""
+        with self._lock:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return
+            self._files[os.path.abspath(path)] = (st.st_size, time.time(), (st.st_dev, st.st_ino))
+
+    def _used(self) -> int:
+        """Bytes on disk, counting hard-linked names (and their blobs) once."""
+        sizes = {inode: size for size, inode in self._links.values()}
+        sizes.update((inode, size) for size, _, inode in self._files.values())
+        return sum(sizes.values())
+
+    def touch(self, path):
+        """Marks a file as recently used so LRU eviction keeps it."""
+        try:
+            os.utime(path)
+        except OSError:
+            return
+        self.record(path)
+
+    def usage(self) -> dict:
+        """Occupancy of the download directory."""
+        with self._lock:
+            self._refresh()
+            used = self._used()
+            count = len(self._files)
+        return {
+            "directory": self.directory,
+            "bytes": used,
+            "files": count,
+            "max_bytes": self.max_bytes,
+            "free_disk_bytes": shutil.disk_usage(self.directory).free,
+        }
+
+    def ensure_headroom(self, needed_bytes: int = 0):
+        """Evicts old files until `needed_bytes` fit; raises StorageFull if they cannot."""
+        if self.max_bytes and needed_bytes > self.max_bytes:
+            raise TooLarge(f"A {needed_bytes}-byte download exceeds the {self.max_bytes}-byte budget")
+        with self._lock:
+            self._refresh(force=True)
+            now = time.time()
+            used = self._used()
+            free = shutil.disk_usage(self.directory).free
+
+            def over_budget():
+                return (self.max_bytes and used + needed_bytes > self.max_bytes) or (
+                    self.min_free_bytes and free - needed_bytes < self.min_free_bytes
+                )
+
+            links = Counter(inode for _, _, inode in self._files.values())
+            shadows = defaultdict(list)
+            for path, (_, inode) in self._links.items():
+                shadows[inode].append(path)
+
+            # Oldest first; expired files go regardless of the budget
+            for path, (size, last_used, inode) in sorted(self._files.items(), key=lambda kv: kv[1][1]):
+                age = now - last_used
+                expired = self.max_age and age > self.max_age
+                partial = path.endswith(PARTIAL_SUFFIXES)
+                if not expired and (partial or age < self.min_age or not over_budget()):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logging.error(f"Could not evict {path}: {e}")
+                    continue
+                del self._files[path]
+                links[inode] -= 1
+                if not links[inode] and self._remove_shadows(shadows.pop(inode, ())):
+                    used -= size
+                    free += size
+
+            if over_budget():
+                raise StorageFull(
+                    f"Download folder is full ({used} of {self.max_bytes} bytes used, "
+                    f"{free} bytes free on disk)"
+                )
+
+    def _remove_shadows(self, paths) -> bool:
+        """Removes the link_dirs links of a file whose last name was evicted; True if all went."""
+        removed = True
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.error(f"Could not remove {path}: {e}")
+                removed = False
+                continue
+            self._links.pop(path, None)
+        return removed
@@ -0,0 +1,166 @@
+import re
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from fbdl.metrics import stage
+
+# -----------------------------
+# URL cleaning and validation
+# -----------------------------
+# Query parameters that identify the video itself (watch/?v=, story.php?story_fbid=&id=)
+# survive cleaning; tracking parameters are dropped.
+KEEP_QUERY_PARAMS = ("v", "story_fbid", "id")
+
+def _clean_query(query: str) -> str:
+    return urlencode([(k, v) for k, v in parse_qsl(query) if k in KEEP_QUERY_PARAMS])
+
+def clean_facebook_url(url: str) -> str:
+    """Cleans Facebook URL to its base form."""
+    parsed = urlparse(url.strip())
+    clean = parsed._replace(query=_clean_query(parsed.query), fragment="")
+    return urlunparse(clean)
+
+#This now matches:
+
+#www.facebook.com
+#m.facebook.com
+#web.facebook.com
+#fb.watch/...
+
+# Compiled once at import; every validator call reuses it
+FB_VIDEO_PATTERN = re.compile(
+    r'^(https?://)?'                                # optional http/https
+    r'([a-z0-9-]+\.)?'                              # optional subdomain (www, m, web, l, etc.)
+    r'(facebook\.com|fb\.watch|fb\.me)/'            # main domains
+    r'('
+    r'[^ ]*/videos/\d+[^ ]*|'                       # /videos/123...
+    r'reel/\d+[^ ]*|'                               # /reel/123...
+    r'watch/\?v=\d+[^ ]*|'                          # /watch/?v=123...
+    r'story\.php\?story_fbid=\d+[^ ]*|'             # story.php?story_fbid=...
+    r'share/r/[A-Za-z0-9_-]+/?|'                    # /share/r/...
+    r'[A-Za-z0-9_-]+/?'                             # fb.watch/abc123 or fb.me/abc123
+    r')',
+    re.IGNORECASE
+)
+
+def is_valid_facebook_video_url(url: str) -> bool:
+    """Validates if a URL is a known Facebook video or reel format."""
+    return FB_VIDEO_PATTERN.match(url.strip()) is not None
+
+# -----------------------------
+# Bulk paste ingestion
+# -----------------------------
+_WHITESPACE = re.compile(r'\s+')
+_SCHEME_HOST = re.compile(r'^(?:https?://)?([^/?#]*)(.*)$', re.IGNORECASE)
+# Facebook serves the same pages from these hosts; they all map to www.
+_FACEBOOK_HOST_ALIASES = {"facebook.com", "www.facebook.com", "m.facebook.com", "web.facebook.com",
+                          "mbasic.facebook.com", "touch.facebook.com", "mobile.facebook.com"}
+
+
+def _strip_query(url: str) -> str:
+    """Same result as clean_facebook_url for a single token, mostly without urlparse."""
+    url, _, query = url.partition("#")[0].partition("?")
+    if query:
+        query = _clean_query(query)
+        if query:
+            return f"{url}?{query}"
+    return url
+
+
+def canonical_url(url: str) -> str:
+    """Returns an https URL with the Facebook host variants (m./web./www.) folded together."""
+    host, rest = _SCHEME_HOST.match(url).groups()
+    host = host.lower()
+    if host in _FACEBOOK_HOST_ALIASES:
+        host = "www.facebook.com"
+    path, sep, query = rest.partition("?")
+    return f"https://{host}{path.rstrip('/')}{sep}{query}"
+
+
+# -----------------------------
+# Canonical video keys
+# -----------------------------
+# Every URL form the validator accepts maps onto one (kind, id) pair so the
+# queue, the caches and the ZIP never treat two spellings of one video as
+# different items. /reel/, /videos/ and watch/?v= all carry the same numeric
+# video id; story posts, share/r/ tokens and fb.watch / fb.me short links are
+# opaque until yt_dlp resolves them.
+_KEY_PATTERNS = (
+    ("video", re.compile(r'/(?:reel|videos)/(\d+)', re.IGNORECASE)),
+    ("video", re.compile(r'/watch/?\?(?:[^#]*&)?v=(\d+)', re.IGNORECASE)),
+    ("story", re.compile(r'/story\.php\?(?:[^#]*&)?story_fbid=(\d+)', re.IGNORECASE)),
+    ("share", re.compile(r'/share/r/([A-Za-z0-9_-]+)', re.IGNORECASE)),
+)
+_SHORT_LINK = re.compile(r'^https://(?:[a-z0-9-]+\.)?(?:fb\.watch|fb\.me)/([A-Za-z0-9_-]+)$', re.IGNORECASE)
+
+
+def video_key(url: str):
+    """Returns the canonical (kind, id) for a Facebook video URL, or None if unrecognized."""
+    return _key_of_canonical(canonical_url(_strip_query(url.strip())))
+
+
+def _key_of_canonical(url: str):
+    for kind, pattern in _KEY_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return kind, match.group(1)
+    match = _SHORT_LINK.match(url)
+    if match:
+        return "short", match.group(1)
+    return None
+
+
+def cache_key(url: str) -> str:
+    """String form of video_key(), falling back to the canonical URL."""
+    return _cache_key_of_canonical(canonical_url(_strip_query(url.strip())))
+
+
+def _cache_key_of_canonical(url: str) -> str:
+    key = _key_of_canonical(url)
+    return url if key is None else f"{key[0]}:{key[1]}"
+
+
+class IngestResult(NamedTuple):
+    accepted: list   # canonical URLs, in input order
+    rejected: list   # (raw url or line, reason) pairs; reason is "invalid" or "duplicate"
+
+
+def ingest_urls(text, existing=()) -> IngestResult:
+    """Normalizes a whole paste in one pass.
+
+    `text` may be a string or an iterable of lines. A line may hold several
+    URLs separated by whitespace; a line without any valid URL is rejected
+    once, as a whole, rather than word by word. URLs that share a canonical
+    video key with an earlier one, or with `existing`, count as duplicates.
+    """
+    with stage("validate"):
+        return _ingest(text, existing)
+
+
+def _ingest(text, existing) -> IngestResult:
+    lines = text.splitlines() if isinstance(text, str) else text
+    seen = {cache_key(u) for u in existing if u.strip()}
+    accepted = []
+    rejected = []
+    match = FB_VIDEO_PATTERN.match
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        tokens = [(raw, _strip_query(raw)) for raw in _WHITESPACE.split(line)]
+        valid = [match(url) is not None for _, url in tokens]
+        if not any(valid):
+            rejected.append((line, "invalid"))
+            continue
+        for (raw, url), ok in zip(tokens, valid):
+            if not ok:
+                rejected.append((raw, "invalid"))
+                continue
+            url = canonical_url(url)
+            key = _cache_key_of_canonical(url)
+            if key in seen:
+                rejected.append((raw, "duplicate"))
+                continue
+            seen.add(key)
+            accepted.append(url)
+    return IngestResult(accepted, rejected)
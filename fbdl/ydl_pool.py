@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# -----------------------------
+# Pooled yt_dlp.YoutubeDL instances
+# -----------------------------
+# Building a YoutubeDL re-initializes extractors, the cookie jar and the HTTP
+# session, so every download used to pay a fresh TLS handshake with Facebook's
+# CDN. The pool keeps finished instances around (per distinct option set) and
+# leases each one to a single thread at a time. Instances are closed once
+# they sit idle longer than idle_timeout, after max_uses leases, or after a
+# lease that ended in an exception (health recycling).
+class _HookSlot:
+    """Stable progress hook registered once per instance; forwards to the current lease's hook."""
+
+    def __init__(self):
+        self.target = None
+
+    def __call__(self, d):
+        if self.target is not None:
+            self.target(d)
+
+
+class _Pooled:
+    __slots__ = ("ydl", "hook", "uses", "idle_since")
+
+    def __init__(self, ydl, hook):
+        self.ydl = ydl
+        self.hook = hook
+        self.uses = 0
+        self.idle_since = time.monotonic()
+
+
+class YDLPool:
+    """Thread-safe pool of long-lived YoutubeDL instances."""
+
+    def __init__(self, base_opts: dict = None, idle_timeout: float = 300, max_uses: int = 100, max_idle: int = 8):
+        self.base_opts = dict(base_opts or {})
+        self.idle_timeout = idle_timeout
+        self.max_uses = max_uses
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = {}
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def _key(opts: dict):
+        return tuple(sorted((k, repr(v)) for k, v in opts.items()))
+
+    def _create(self, opts):
+        import yt_dlp
+
+        hook = _HookSlot()
+        params = {**self.base_opts, **opts, "progress_hooks": [hook]}
+        self.created += 1
+        return _Pooled(yt_dlp.YoutubeDL(params), hook)
+
+    @contextmanager
+    def lease(self, opts: dict, progress_hook=None):
+        """Yields a YoutubeDL configured with `opts` for exclusive use by the caller."""
+        key = self._key(opts)
+        self.reap()
+        with self._lock:
+            bucket = self._idle.get(key)
+            pooled = bucket.pop() if bucket else None
+            if pooled is not None:
+                self.reused += 1
+        if pooled is None:
+            pooled = self._create(opts)
+
+        pooled.hook.target = progress_hook
+        healthy = False
+        try:
+            yield pooled.ydl
+            healthy = True
+        finally:
+            pooled.hook.target = None
+            pooled.uses += 1
+            self._release(key, pooled, healthy)
+
+    def _release(self, key, pooled, healthy):
+        if healthy and pooled.uses < self.max_uses:
+            pooled.idle_since = time.monotonic()
+            with self._lock:
+                bucket = self._idle.setdefault(key, [])
+                if len(bucket) < self.max_idle:
+                    bucket.append(pooled)
+                    return
+        self._close(pooled)
+
+    @staticmethod
+    def _close(pooled):
+        try:
+            pooled.ydl.close()
+        except Exception as e:
+            logging.error(f"Failed to close pooled YoutubeDL: {e}")
+
+    def reap(self):
+        """Closes instances that have been idle longer than idle_timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        with self._lock:
+            for key, bucket in list(self._idle.items()):
+                keep = [p for p in bucket if p.idle_since >= cutoff]
+                expired.extend(p for p in bucket if p.idle_since < cutoff)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+        for pooled in expired:
+            self._close(pooled)
+
+    def stats(self) -> dict:
+        with self._lock:
+            idle = sum(len(bucket) for bucket in self._idle.values())
+        return {"idle": idle, "created": self.created, "reused": self.reused}
+
+    def close(self):
+        with self._lock:
+            pooled = [p for bucket in self._idle.values() for p in bucket]
+            self._idle.clear()
+        for p in pooled:
+            self._close(p)
@@ -0,0 +1,297 @@
+import json
+import logging
+import os
+import re
+import shutil
+import struct
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from fbdl.metrics import stage
+
+# -----------------------------
+# "Download All" ZIP, grown on disk as downloads finish
+# -----------------------------
+# Videos are already compressed, so deflating them again only burns CPU.
+CHUNK_SIZE = 1024 * 1024
+STORED_EXTENSIONS = {".mp4", ".m4a", ".m4v", ".webm", ".mkv", ".mov", ".mp3", ".aac", ".opus", ".jpg", ".png"}
+# Same thresholds zipfile uses for switching to ZIP64 records
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_FILECOUNT_LIMIT = (1 << 16) - 1
+_CENTRAL_DIR = struct.Struct("<4s4B4HL2L5H2L")
+_END_64 = struct.Struct("<4sQ2H2L4Q")
+_END_64_LOCATOR = struct.Struct("<4sLQL")
+_END = struct.Struct("<4s4H2LH")
+_BUNDLE_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def compression_for(path: str) -> int:
+    ext = os.path.splitext(path)[1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def _without_zip64(extra: bytes) -> bytes:
+    """Drops ZIP64 size/offset fields from an extra block; they are rebuilt from the ZipInfo."""
+    kept = b""
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, size = struct.unpack_from("<HH", extra, pos)
+        if tag != 1:
+            kept += extra[pos:pos + 4 + size]
+        pos += 4 + size
+    return kept
+
+
+def central_directory(infos, offset: int) -> bytes:
+    """Central directory and end records for entries already on disk, to be written at `offset`."""
+    out = bytearray()
+    for info in infos:
+        file_size, compress_size, header_offset = info.file_size, info.compress_size, info.header_offset
+        zip64 = []
+        if file_size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT:
+            zip64 += [file_size, compress_size]
+            file_size = compress_size = 0xFFFFFFFF
+        if header_offset > ZIP64_LIMIT:
+            zip64.append(header_offset)
+            header_offset = 0xFFFFFFFF
+        extra = _without_zip64(info.extra)
+        extract_version = info.extract_version
+        if zip64:
+            extra = struct.pack(f"<HH{len(zip64)}Q", 1, 8 * len(zip64), *zip64) + extra
+            extract_version = max(extract_version, zipfile.ZIP64_VERSION)
+        name = info.filename.encode("utf-8" if info.flag_bits & 0x800 else "cp437")
+        year, month, day, hour, minute, second = info.date_time
+        out += _CENTRAL_DIR.pack(
+            b"PK\x01\x02", info.create_version, info.create_system, extract_version, info.reserved,
+            info.flag_bits, info.compress_type, hour << 11 | minute << 5 | second // 2,
+            (year - 1980) << 9 | month << 5 | day, info.CRC, compress_size, file_size,
+            len(name), len(extra), len(info.comment), 0, info.internal_attr, info.external_attr, header_offset,
+        )
+        out += name + extra + info.comment
+
+    count, size = len(infos), len(out)
+    if count > ZIP_FILECOUNT_LIMIT or size > ZIP64_LIMIT or offset > ZIP64_LIMIT:
+        out += _END_64.pack(b"PK\x06\x06", 44, zipfile.ZIP64_VERSION, zipfile.ZIP64_VERSION, 0, 0,
+                            count, count, size, offset)
+        out += _END_64_LOCATOR.pack(b"PK\x06\x07", 0, offset + size, 1)
+        count, size, offset = min(count, 0xFFFF), min(size, 0xFFFFFFFF), min(offset, 0xFFFFFFFF)
+    out += _END.pack(b"PK\x05\x06", 0, 0, count, count, size, offset, 0)
+    return bytes(out)
+
+
+class IncrementalZip:
+    """A session's "Download All" archive, grown one entry at a time as downloads finish.
+
+    Each append() opens the archive in "a" mode: the new entry is written
+    where the old central directory was and a new directory follows it, so
+    the bytes of earlier entries are never read or rewritten. remove() writes
+    a new directory without the entry at the end of the file; the entry's
+    data and the old directory stay behind as unreferenced bytes until the
+    archive is discarded. The source path of every entry is kept in a small
+    JSON file next to the archive, so a restored queue carries on with the
+    same archive. Use one instance per archive (see BundleRegistry).
+
+    Once the archive has been offered for download (mark_offered()), someone
+    may be reading it, and an append would overwrite the directory under
+    them. The next append therefore copies the archive, writes into the copy
+    and renames it over the original; readers keep the file they opened.
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._index_path = f"{self.path}.json"
+        self._lock = threading.Lock()
+        # source path -> archive name, in the order they were added
+        self._entries = {}
+        # Set by discard(): a download finishing afterwards must not bring the archive back
+        self._discarded = False
+        # Set by mark_offered(): the file on disk may be being downloaded, so append into a copy
+        self._offered = False
+        if os.path.exists(self.path):
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                entries = json.load(f)
+            with zipfile.ZipFile(self.path) as zf:
+                names = set(zf.namelist())
+        except (OSError, ValueError, zipfile.BadZipFile):
+            # Half-written or orphaned archive: start over
+            self._remove_files()
+            return
+        self._entries = {path: name for path, name in entries.items() if name in names}
+
+    def _save(self):
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self._index_path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return path in self._entries
+
+    def paths(self) -> list:
+        with self._lock:
+            return list(self._entries)
+
+    def _arcname(self, path):
+        taken = set(self._entries.values())
+        name = os.path.basename(path)
+        stem, ext = os.path.splitext(name)
+        n = 0
+        while name in taken:
+            n += 1
+            name = f"{stem} ({n}){ext}"
+        return name
+
+    def append(self, path: str, chunk_size: int = CHUNK_SIZE) -> bool:
+        """Adds `path` to the archive unless it is already in it. Returns True if an entry was written."""
+        with self._lock:
+            if self._discarded or path in self._entries:
+                return False
+            if self._entries and not os.path.exists(self.path):
+                # The archive was evicted (fbdl.storage); start a new one
+                self._entries = {}
+            arcname = self._arcname(path)
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = compression_for(path)
+            target = self.path
+            with stage("zip"):
+                if self._offered and os.path.exists(self.path):
+                    target = f"{self.path}.tmp"
+                    shutil.copyfile(self.path, target)
+                try:
+                    with zipfile.ZipFile(target, "a") as zf:
+                        with open(path, "rb") as src, zf.open(info, "w") as dst:
+                            shutil.copyfileobj(src, dst, chunk_size)
+                    if target != self.path:
+                        os.replace(target, self.path)
+                finally:
+                    if target != self.path and os.path.exists(target):
+                        os.remove(target)
+            self._offered = False
+            self._entries[path] = arcname
+            self._save()
+            return True
+
+    def mark_offered(self):
+        """Records that the archive may now be downloaded; later appends leave this file untouched."""
+        with self._lock:
+            self._offered = True
+
+    def remove(self, path: str) -> bool:
+        """Drops `path` from the archive's directory; the entry's bytes are left in place.
+
+        Only bytes past the current end of the file are written, so a reader
+        of the old size still sees the old, complete archive.
+        """
+        with self._lock:
+            arcname = self._entries.pop(path, None)
+            if arcname is None:
+                return False
+            if os.path.exists(self.path):
+                with zipfile.ZipFile(self.path) as zf:
+                    infos = [info for info in zf.infolist() if info.filename != arcname]
+                with open(self.path, "r+b") as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(central_directory(infos, offset))
+            self._save()
+            return True
+
+    def sync(self, paths) -> bool:
+        """Makes the archive hold exactly `paths`: new files are appended, missing ones removed."""
+        paths = [p for p in dict.fromkeys(paths) if os.path.exists(p)]
+        wanted = set(paths)
+        changed = False
+        for path in self.paths():
+            if path not in wanted:
+                changed = self.remove(path) or changed
+        for path in paths:
+            changed = self.append(path) or changed
+        return changed
+
+    def discard(self):
+        with self._lock:
+            self._discarded = True
+            self._entries = {}
+            self._remove_files()
+
+    def _remove_files(self):
+        for path in (self.path, self._index_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class BundleRegistry:
+    """One IncrementalZip per archive for the whole process, and the threads that fill them.
+
+    A refreshed tab and the jobs its previous page left running share the
+    same instance (and lock), so appends to one archive never interleave.
+    Copies run on their own small executor rather than on a download worker.
+    """
+
+    def __init__(self, directory, max_workers: int = 1):
+        self.directory = str(directory)
+        self._lock = threading.Lock()
+        self._bundles = {}
+        # archive path -> appends/syncs queued or running for it
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fbdl-zip")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        if not _BUNDLE_NAME_RE.match(name or ""):
+            raise ValueError(f"Invalid bundle name: {name!r}")
+        return os.path.join(self.directory, f"bundle_{name}.zip")
+
+    def get(self, name: str) -> IncrementalZip:
+        path = self.path(name)
+        with self._lock:
+            bundle = self._bundles.get(path)
+            if bundle is None:
+                bundle = self._bundles[path] = IncrementalZip(path)
+            return bundle
+
+    def discard(self, name: str):
+        """Deletes the archive; jobs still holding the old instance can no longer write to it."""
+        path = self.path(name)
+        with self._lock:
+            bundle = self._bundles.pop(path, None) or IncrementalZip(path)
+        bundle.discard()
+
+    def append_later(self, bundle: IncrementalZip, path: str):
+        """Queues `path` to be appended to `bundle`; returns the Future."""
+        return self._submit(bundle, f"add {path} to", bundle.append, path)
+
+    def sync_later(self, bundle: IncrementalZip, paths):
+        """Queues IncrementalZip.sync(paths) behind any appends already waiting; returns the Future."""
+        return self._submit(bundle, "sync", bundle.sync, list(paths))
+
+    def pending(self, bundle: IncrementalZip) -> int:
+        """Appends and syncs queued or running for `bundle`; offer it only once this is 0."""
+        with self._lock:
+            return self._pending.get(bundle.path, 0)
+
+    def _submit(self, bundle, what, fn, *args):
+        with self._lock:
+            self._pending[bundle.path] = self._pending.get(bundle.path, 0) + 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self._done(f, bundle, what))
+        return future
+
+    def _done(self, future, bundle, what):
+        with self._lock:
+            left = self._pending.pop(bundle.path) - 1
+            if left:
+                self._pending[bundle.path] = left
+        if not future.cancelled() and future.exception() is not None:
+            # The page re-syncs the archive when the batch ends
+            logging.error(f"Could not {what} {bundle.path}: {future.exception()}")
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
@@ -1,6 +1,11 @@
-import os
-import pandas as pd
 import streamlit as st
+from fbdl.config import FEEDBACK_DB, FEEDBACK_CSV
+from fbdl.feedback import FeedbackStore
+
+@st.cache_resource
+def get_feedback_store():
+    """One SQLite feedback store per server process; imports the old CSV on first use."""
+    return FeedbackStore(FEEDBACK_DB, legacy_csv=FEEDBACK_CSV)
 
 def contact_page():
     st.set_page_config(
@@ -26,16 +31,7 @@ def contact_page():
     # =======================
     # Feedback Storage Setup
     # =======================
-    FEEDBACK_FILE = "feedback.csv"
-
-    def load_feedback():
-        if os.path.exists(FEEDBACK_FILE):
-            return pd.read_csv(FEEDBACK_FILE).to_dict("records")
-        return []
-
-    def save_feedback(feedback_list):
-        df = pd.DataFrame(feedback_list)
-        df.to_csv(FEEDBACK_FILE, index=False)
+    feedback_store = get_feedback_store()
 
     # =======================
     # Streamlit Feedback Form
@@ -43,10 +39,6 @@ def contact_page():
     st.header("Feedback Form")
     st.write("We`d love to hear from you! 💬")
 
-    # Initialize session state
-    if "feedback_messages" not in st.session_state:
-        st.session_state.feedback_messages = load_feedback()
-
     with st.form("contact_form"):
         name = st.text_input("Your Name")
         email = st.text_input("Your Email")
@@ -55,21 +47,8 @@ def contact_page():
 
         if submitted:
             if name.strip() and email.strip() and message.strip():
-                # Remove old message from same email
-                st.session_state.feedback_messages = [
-                    fb for fb in st.session_state.feedback_messages if fb["email"] != email
-                ]
-                # Add new message
-                st.session_state.feedback_messages.append({
-                    "name": name,
-                    "email": email,
-                    "message": message
-                })
-                # Keep only latest 50
-                if len(st.session_state.feedback_messages) > 50:
-                    st.session_state.feedback_messages.pop(0)
-                # Save
-                save_feedback(st.session_state.feedback_messages)
+                # Append only; the list below shows each email's newest message
+                feedback_store.add(name, email, message)
                 st.success("✅ Thank you! Your message has been received.")
             else:
                 st.error("⚠️ Please fill in all fields before submitting.")
@@ -77,10 +56,12 @@ def contact_page():
     # =======================
     # Display Latest Feedback
     # =======================
-    if st.session_state.feedback_messages:
+    # Latest 50, newest first
+    feedback_messages = feedback_store.latest(50)
+    if feedback_messages:
         st.subheader("Latest Feedback")
         # Display feedback messages
-        for fb in reversed(st.session_state.feedback_messages):
+        for fb in feedback_messages:
             with st.container():
                 # Name & email
                 st.subheader(fb["name"])
@@ -0,0 +1,41 @@
+import os
+
+from fbdl.cache import ResultCache
+
+URL = "https://www.facebook.com/reel/1234567890"
+
+
+def _write(path, size=1024):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    return str(path)
+
+
+def test_put_never_deletes_files(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"), ttl=0, prune_interval=0)
+    old = _write(tmp_path / "old.mp4")
+    cache.put("https://www.facebook.com/reel/1", "1", old)
+    # ttl=0: the first entry is expired by the time the second is recorded
+    cache.put(URL, "1234567890", _write(tmp_path / "new.mp4"))
+    assert os.path.exists(old)
+
+
+def test_entries_whose_file_is_gone_are_dropped(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"), prune_interval=0)
+    path = _write(tmp_path / "video.mp4")
+    cache.put(URL, "1234567890", path)
+    assert cache.lookup(URL) == path
+    assert cache.lookup_id("1234567890") == path
+
+    os.remove(path)
+    assert cache.lookup(URL) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_prune_sweeps_orphaned_rows(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"), prune_interval=0)
+    gone = _write(tmp_path / "gone.mp4")
+    cache.put("https://www.facebook.com/reel/1", "1", gone)
+    os.remove(gone)
+    cache.put(URL, "1234567890", _write(tmp_path / "kept.mp4"))
+    assert cache.stats()["entries"] == 1
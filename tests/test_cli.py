@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import time
+
+import pytest
+
+from fbdl import cli, config, storage
+from fbdl.download_queue import QueueItem
+
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    """Runs `fbdl batch` up to run_batch and returns the Downloader it built."""
+    built = {}
+
+    def fake_run_batch(urls, downloader, *args, **kwargs):
+        built["downloader"] = downloader
+        return 0
+
+    monkeypatch.setattr(cli, "run_batch", fake_run_batch)
+    monkeypatch.setattr(config, "STATE_DIR", str(tmp_path / "state"))
+    urls = tmp_path / "urls.txt"
+    urls.write_text("")
+
+    def run(*extra):
+        out = tmp_path / "out"
+        argv = ["batch", str(urls), "--out", str(out), "--cache-db", str(tmp_path / "cache.sqlite"), *extra]
+        assert cli.main(argv) == 0
+        return built["downloader"]
+
+    return run
+
+
+def test_out_is_never_evicted_without_a_budget(batch, tmp_path, monkeypatch):
+    downloader = batch()
+    old = tmp_path / "out" / "holiday.mp4"
+    old.write_bytes(b"x" * 1024)
+    then = time.time() - 2 * 3600
+    os.utime(old, (then, then))
+
+    # Even with the disk looking full, a folder without --max-bytes is left alone
+    monkeypatch.setattr(storage.shutil, "disk_usage", lambda path: shutil._ntuple_diskusage(1, 1, 0))
+    downloader.storage.ensure_headroom(0)
+    assert old.exists()
+
+
+def test_budget_enables_eviction(batch):
+    downloader = batch("--max-bytes", "1000")
+    assert downloader.storage.max_bytes == 1000
+    assert downloader.storage.min_free_bytes == config.STORAGE_MIN_FREE_BYTES
+
+
+def test_failed_done_events_carry_the_log():
+    item = QueueItem("https://www.facebook.com/reel/1", "failed", error="Video unavailable", retryable=False,
+                     log=["ERROR: Video unavailable"])
+    assert cli._summary(item) == {
+        "url": item.url, "status": "failed", "file_path": None,
+        "error": "Video unavailable", "retryable": False, "log": ["ERROR: Video unavailable"],
+    }
+
+
+@pytest.mark.parametrize("token", ["nightly", "2026.10.18", "../../etc", "x" * 65])
+def test_resume_rejects_names_the_store_cannot_save(batch, token, capsys):
+    with pytest.raises(SystemExit) as exc:
+        batch("--resume", token)
+    assert exc.value.code == 2
+    assert "not a valid token" in capsys.readouterr().err
+
+
+def test_resume_accepts_valid_tokens(batch):
+    batch("--resume", "nightly-2026-10-18")
+
+
+def test_read_urls_rejects_per_line(capsys):
+    assert cli.read_urls(["# comment\n", "not a url\n", "https://www.facebook.com/reel/1\n"]) == [
+        "https://www.facebook.com/reel/1"]
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(e["event"], e["url"]) for e in events] == [
+        ("rejected", "not a url"), ("accepted", "https://www.facebook.com/reel/1")]
@@ -0,0 +1,167 @@
+import random
+
+import pytest
+
+from fbdl.download_queue import DownloadQueue, QueueItem
+from fbdl.engine import DownloadEngine
+from fbdl.failures import LOCAL, PERMANENT, RETRYABLE, DownloadFailed, classify
+from fbdl.retry import CircuitBreaker, RetryPolicy
+from fbdl.storage import StorageFull, TooLarge
+
+URL = "https://www.facebook.com/reel/1"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def failing(*kinds):
+    """download_fn that raises DownloadFailed of each kind in turn, then succeeds."""
+    calls = []
+
+    def download(url, progress_callback):
+        calls.append(url)
+        if len(calls) <= len(kinds):
+            raise DownloadFailed("boom", kind=kinds[len(calls) - 1])
+        progress_callback(1.0)
+        return "/tmp/video.mp4"
+
+    return download, calls
+
+
+@pytest.fixture
+def engine_factory():
+    engines = []
+
+    def make(**kwargs):
+        engine = DownloadEngine(max_workers=2, **kwargs)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.shutdown()
+
+
+def test_retry_delay_is_capped_and_honours_retry_after():
+    policy = RetryPolicy(max_attempts=3, base_delay=2.0, max_delay=5.0, rng=random.Random(1))
+    assert policy.should_retry(2) and not policy.should_retry(3)
+    assert all(0 <= policy.delay(attempt) <= min(5.0, 2.0 * 2 ** (attempt - 1)) for attempt in range(1, 10))
+    assert policy.delay(1, retry_after=4.0) >= 4.0
+    # Retry-After never pushes past max_delay
+    assert policy.delay(1, retry_after=500) <= 5.0
+
+
+def test_breaker_trips_after_threshold_and_closes_on_success():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=2, cooldown=10, clock=clock)
+    assert breaker.record_failure("h") == 0.0
+    assert breaker.record_failure("h") == 110.0
+    assert breaker.tripped("h") and breaker.open_hosts() == ["h"]
+
+    clock.now = 111
+    assert breaker.open_hosts() == []
+    breaker.record_success("h")
+    assert not breaker.tripped("h")
+
+
+def test_failed_probe_reopens_at_once_with_a_doubled_cooldown():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=2, cooldown=10, max_cooldown=15, clock=clock)
+    breaker.record_failure("h")
+    breaker.record_failure("h")
+    clock.now = 111
+    assert breaker.record_failure("h") == 111 + 15
+
+
+def test_retry_after_opens_the_breaker_immediately():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=5, cooldown=10, clock=clock)
+    assert breaker.record_failure("h", retry_after=30) == 130.0
+
+
+def test_classify_storage_full():
+    assert classify(StorageFull("Download folder is full")) == LOCAL
+    assert classify(TooLarge("A 10-byte download exceeds the 5-byte budget")) == PERMANENT
+    assert DownloadFailed("full", kind=LOCAL).retryable
+    assert not DownloadFailed("gone", kind=PERMANENT).retryable
+
+
+def test_retryable_failures_are_retried_until_success(engine_factory):
+    engine = engine_factory(retry=RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.01))
+    download, calls = failing(RETRYABLE, RETRYABLE)
+    item = QueueItem(URL)
+    assert engine.submit(item, download).result(timeout=5) == "success"
+    assert len(calls) == 3
+    assert item.file_path == "/tmp/video.mp4"
+
+
+def test_retries_stop_at_max_attempts(engine_factory):
+    engine = engine_factory(retry=RetryPolicy(max_attempts=2, base_delay=0.01, max_delay=0.01))
+    download, calls = failing(RETRYABLE, RETRYABLE, RETRYABLE)
+    item = QueueItem(URL)
+    assert engine.submit(item, download).result(timeout=5) == "failed"
+    assert len(calls) == 2
+    assert item.retryable
+
+
+def test_permanent_failures_are_not_retried_or_resubmitted(engine_factory):
+    engine = engine_factory(retry=RetryPolicy(max_attempts=3, base_delay=0.01))
+    download, calls = failing(PERMANENT)
+    item = QueueItem(URL)
+    assert engine.submit(item, download).result(timeout=5) == "failed"
+    assert not item.retryable
+    assert engine.submit(item, download).result(timeout=5) == "failed"
+    assert len(calls) == 1
+
+
+def test_local_failures_skip_retries_and_the_breaker(engine_factory):
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    engine = engine_factory(retry=RetryPolicy(max_attempts=3, base_delay=0.01), breaker=breaker)
+    download, calls = failing(LOCAL)
+    item = QueueItem(URL)
+    assert engine.submit(item, download).result(timeout=5) == "failed"
+    assert len(calls) == 1
+    # Still offered to the user, and the host was not paused
+    assert item.retryable
+    assert not breaker.tripped("www.facebook.com")
+
+
+def test_retryable_failure_pauses_the_host(engine_factory):
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    engine = engine_factory(breaker=breaker)
+    download, _ = failing(RETRYABLE)
+    assert engine.submit(QueueItem(URL), download).result(timeout=5) == "failed"
+    assert engine.metrics()["paused_hosts"] == ["www.facebook.com"]
+
+
+def test_cancel_session_drops_queued_jobs(engine_factory):
+    engine = engine_factory(host_rate=0.01)
+    download, calls = failing()
+    first = engine.submit(QueueItem(URL), download, session="s")
+    # The host interval (100 s) keeps the second job queued
+    second_item = QueueItem("https://www.facebook.com/reel/2")
+    second = engine.submit(second_item, download, session="s")
+    assert first.result(timeout=5) == "success"
+    assert engine.cancel_session("s") == 1
+    assert second.cancelled()
+    assert second_item.status == "waiting"
+    assert len(calls) == 1
+
+
+def test_failure_log_is_kept_on_the_item_and_saved(engine_factory):
+    engine = engine_factory()
+
+    def download(url, progress_callback):
+        raise DownloadFailed("Video unavailable", kind=PERMANENT, log=["WARNING: slow", "ERROR: Video unavailable"])
+
+    item = QueueItem(URL)
+    assert engine.submit(item, download).result(timeout=5) == "failed"
+    assert item.log == ("WARNING: slow", "ERROR: Video unavailable")
+
+    restored = DownloadQueue.from_records(DownloadQueue([item]).to_records())[0]
+    assert restored.log == item.log and restored.error == "Video unavailable"
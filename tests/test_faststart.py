@@ -0,0 +1,171 @@
+import struct
+
+import pytest
+
+from fbdl.faststart import FaststartError, _rebuild, faststart
+
+CONTAINERS = (b"moov", b"trak", b"mdia", b"minf", b"stbl")
+
+
+def atom(kind, body=b"", large=False):
+    if large:
+        return struct.pack(">I4sQ", 1, kind, 16 + len(body)) + body
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def chunk_table(offsets, kind=b"stco"):
+    fmt = "I" if kind == b"stco" else "Q"
+    return atom(kind, struct.pack(f">II{len(offsets)}{fmt}", 0, len(offsets), *offsets))
+
+
+def moov(offsets, kind=b"stco"):
+    stbl = atom(b"stbl", atom(b"stsd", b"\1" * 12) + chunk_table(offsets, kind))
+    return atom(b"moov", atom(b"mvhd", b"\2" * 20) + atom(b"trak", atom(b"mdia", atom(b"minf", stbl))))
+
+
+def chunk_offsets(data):
+    """Every stco/co64 entry in the file, in order, plus the table kinds seen."""
+    offsets, kinds = [], []
+
+    def walk(start, end):
+        pos = start
+        while pos < end:
+            size, kind = struct.unpack_from(">I4s", data, pos)
+            header = 8
+            if size == 1:
+                size = struct.unpack_from(">Q", data, pos + 8)[0]
+                header = 16
+            if kind in CONTAINERS:
+                walk(pos + header, pos + size)
+            elif kind in (b"stco", b"co64"):
+                count = struct.unpack_from(">I", data, pos + header + 4)[0]
+                fmt = "I" if kind == b"stco" else "Q"
+                offsets.extend(struct.unpack_from(f">{count}{fmt}", data, pos + header + 8))
+                kinds.append(kind)
+            pos += size
+
+    walk(0, len(data))
+    return offsets, kinds
+
+
+def top_level(data):
+    kinds, pos = [], 0
+    while pos < len(data):
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        if size == 1:
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+        kinds.append(kind)
+        pos += size
+    return kinds
+
+
+def make_file(tmp_path, mdats, large_mdat=False, moov_kind=b"stco"):
+    """ftyp, mdat(s) and a trailing (or in-between) moov whose offsets point at 16-byte chunks.
+
+    `mdats` is a list of chunk counts; a None entry marks where moov goes.
+    """
+    ftyp = atom(b"ftyp", b"isom\0\0\2\0isommp41")
+    # First pass with placeholder offsets to learn the moov size
+    chunk_count = sum(n for n in mdats if n)
+    placeholder = moov([0] * chunk_count, moov_kind)
+    payloads, offsets, pieces = [], [], [ftyp]
+    pos = len(ftyp)
+    for n in mdats:
+        if n is None:
+            pieces.append(None)
+            pos += len(placeholder)
+            continue
+        header = 16 if large_mdat else 8
+        body = b""
+        for _ in range(n):
+            payload = f"chunk-{len(payloads):04d}-data".encode()
+            offsets.append(pos + header + len(body))
+            payloads.append(payload)
+            body += payload
+        piece = atom(b"mdat", body, large=large_mdat)
+        pieces.append(piece)
+        pos += len(piece)
+    index = moov(offsets, moov_kind)
+    data = b"".join(index if p is None else p for p in pieces)
+    path = tmp_path / "video.mp4"
+    path.write_bytes(data)
+    return path, payloads
+
+
+def assert_offsets_point_at(data, payloads):
+    offsets, _ = chunk_offsets(data)
+    assert [data[o:o + len(p)] for o, p in zip(offsets, payloads)] == payloads
+
+
+def test_moves_trailing_moov_and_shifts_offsets(tmp_path):
+    path, payloads = make_file(tmp_path, [3, None])
+    before = path.read_bytes()
+    assert top_level(before) == [b"ftyp", b"mdat", b"moov"]
+
+    assert faststart(str(path)) is True
+    after = path.read_bytes()
+    assert top_level(after) == [b"ftyp", b"moov", b"mdat"]
+    assert len(after) == len(before)
+    assert_offsets_point_at(after, payloads)
+
+
+def test_second_run_is_a_no_op(tmp_path):
+    path, _ = make_file(tmp_path, [2, None])
+    faststart(str(path))
+    rewritten = path.read_bytes()
+    assert faststart(str(path)) is False
+    assert path.read_bytes() == rewritten
+
+
+def test_moov_between_two_mdats(tmp_path):
+    path, payloads = make_file(tmp_path, [2, None, 2])
+    assert faststart(str(path)) is True
+    after = path.read_bytes()
+    assert top_level(after) == [b"ftyp", b"moov", b"mdat", b"mdat"]
+    assert_offsets_point_at(after, payloads)
+
+
+def test_largesize_atoms(tmp_path):
+    path, payloads = make_file(tmp_path, [3, None], large_mdat=True)
+    assert faststart(str(path)) is True
+    after = path.read_bytes()
+    assert top_level(after) == [b"ftyp", b"moov", b"mdat"]
+    assert_offsets_point_at(after, payloads)
+
+
+def test_co64_tables_are_shifted(tmp_path):
+    path, payloads = make_file(tmp_path, [3, None], moov_kind=b"co64")
+    assert faststart(str(path)) is True
+    after = path.read_bytes()
+    assert chunk_offsets(after)[1] == [b"co64"]
+    assert_offsets_point_at(after, payloads)
+
+
+def test_stco_is_upgraded_to_co64_when_offsets_overflow():
+    index = moov([0xFFFFFF00, 0xFFFFFFF0])
+    with pytest.raises(OverflowError):
+        _rebuild(index, 0, len(index), lambda o: o + 0x100, False)
+
+    rebuilt = _rebuild(index, 0, len(index), lambda o: o + 0x100, True)
+    offsets, kinds = chunk_offsets(rebuilt)
+    assert kinds == [b"co64"]
+    assert offsets == [0x100000000, 0x1000000F0]
+    # Each of the two entries grew by 4 bytes, and every enclosing atom with them
+    assert len(rebuilt) == len(index) + 8
+
+
+def test_fragmented_and_indexless_files_are_left_alone(tmp_path):
+    fragmented = tmp_path / "fragmented.mp4"
+    fragmented.write_bytes(atom(b"ftyp", b"isom") + atom(b"mdat", b"x" * 32) + atom(b"moov") + atom(b"moof"))
+    assert faststart(str(fragmented)) is False
+
+    no_moov = tmp_path / "audio.mp4"
+    no_moov.write_bytes(atom(b"ftyp", b"isom") + atom(b"mdat", b"x" * 32))
+    assert faststart(str(no_moov)) is False
+
+
+def test_garbage_raises(tmp_path):
+    path = tmp_path / "not-a-video.mp4"
+    path.write_bytes(b"<html>" * 100)
+    with pytest.raises(FaststartError):
+        faststart(str(path))
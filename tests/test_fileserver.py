@@ -0,0 +1,83 @@
+import http.client
+
+import pytest
+
+from fbdl.fileserver import FileServer
+
+PAYLOAD = bytes(range(256)) * 4  # 1024 bytes
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = FileServer(port=0, public_url="http://files.example")
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def url_path(server, tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(PAYLOAD)
+    url = server.publish(str(path), "my clip.mp4")
+    assert url.startswith("http://files.example/files/")
+    return url[len("http://files.example"):]
+
+
+def fetch(server, path, method="GET", range_header=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    headers = {"Range": range_header} if range_header else {}
+    conn.request(method, path, headers=headers)
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response, body
+
+
+def test_binds_loopback_by_default(server):
+    assert server._httpd.server_address[0] == "127.0.0.1"
+
+
+def test_full_file(server, url_path):
+    response, body = fetch(server, url_path)
+    assert response.status == 200
+    assert body == PAYLOAD
+    assert response.getheader("Accept-Ranges") == "bytes"
+    assert response.getheader("Content-Type") == "video/mp4"
+    assert "my%20clip.mp4" in response.getheader("Content-Disposition")
+
+
+def test_head_sends_no_body(server, url_path):
+    response, body = fetch(server, url_path, method="HEAD")
+    assert response.status == 200
+    assert response.getheader("Content-Length") == str(len(PAYLOAD))
+    assert body == b""
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=1000-2000", 1000, 1023),  # end clamped to the file
+    ("bytes=1000-", 1000, 1023),      # open-ended
+    ("bytes=-24", 1000, 1023),        # suffix
+    ("bytes=-5000", 0, 1023),         # suffix longer than the file
+])
+def test_ranges(server, url_path, header, start, end):
+    response, body = fetch(server, url_path, range_header=header)
+    assert response.status == 206
+    assert body == PAYLOAD[start:end + 1]
+    assert response.getheader("Content-Range") == f"bytes {start}-{end}/{len(PAYLOAD)}"
+    assert response.getheader("Content-Length") == str(end - start + 1)
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=50-10", "bytes=-", "bytes=0-1,5-9", "items=0-1"])
+def test_unsatisfiable_ranges(server, url_path, header):
+    response, body = fetch(server, url_path, range_header=header)
+    assert response.status == 416
+    assert response.getheader("Content-Range") == f"bytes */{len(PAYLOAD)}"
+    assert body == b""
+
+
+def test_unpublished_and_unknown_paths(server, tmp_path, url_path):
+    assert fetch(server, "/files/not-a-token/x.mp4")[0].status == 404
+    assert fetch(server, "/elsewhere")[0].status == 404
+    server.unpublish(str(tmp_path / "clip.mp4"))
+    assert fetch(server, url_path)[0].status == 404
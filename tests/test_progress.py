@@ -0,0 +1,68 @@
+from fbdl.progress import ThrottledProgress, format_eta, format_size
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def recorder():
+    updates = []
+
+    def callback(fraction, speed=None, eta=None):
+        updates.append((fraction, speed, eta))
+
+    return updates, callback
+
+
+def test_ten_thousand_callbacks_are_coalesced():
+    clock = Clock()
+    updates, callback = recorder()
+    hook = ThrottledProgress(callback, clock=clock)
+    # A 10 s download reporting every millisecond
+    for i in range(10_000):
+        clock.now = i / 1000
+        hook({"status": "downloading", "downloaded_bytes": i + 1, "total_bytes": 10_000})
+    hook({"status": "finished"})
+
+    # One update per min_interval (0.25 s) plus the final 100%
+    assert len(updates) == 41
+    assert updates[-1] == (1.0, None, 0)
+    assert [u[0] for u in updates] == sorted(u[0] for u in updates)
+
+
+def test_small_steps_wait_for_the_heartbeat():
+    clock = Clock()
+    updates, callback = recorder()
+    hook = ThrottledProgress(callback, clock=clock)
+    hook({"status": "downloading", "downloaded_bytes": 0, "total_bytes": 1000})
+    # Stalled transfer: no 1% step, so only the max_interval refresh gets through
+    for t in (0.5, 1.0, 1.5, 2.1):
+        clock.now = t
+        hook({"status": "downloading", "downloaded_bytes": 1, "total_bytes": 1000})
+    assert len(updates) == 2
+
+
+def test_speed_and_eta_are_measured_from_the_resume_point():
+    clock = Clock()
+    updates, callback = recorder()
+    hook = ThrottledProgress(callback, clock=clock)
+    # Resumed at 500 of 1000 bytes, then 100 bytes/s
+    hook({"status": "downloading", "downloaded_bytes": 500, "total_bytes": 1000})
+    clock.now = 1.0
+    hook({"status": "downloading", "downloaded_bytes": 600, "total_bytes": 1000})
+    fraction, speed, eta = updates[-1]
+    assert fraction == 0.6
+    assert speed == 100.0
+    assert eta == 4.0
+
+
+def test_formatting():
+    assert format_size(512) == "512 B"
+    assert format_size(3 * 1024 ** 2) == "3 MB"
+    assert format_eta(None) == ""
+    assert format_eta(75) == "1m 15s"
+    assert format_eta(3 * 3600 + 120) == "3h 2m"
@@ -0,0 +1,128 @@
+import os
+import time
+
+import pytest
+
+from fbdl.blobstore import BlobStore, hash_file
+from fbdl.storage import StorageFull, StorageManager, TooLarge
+
+MB = 1024 * 1024
+# Room for the blob store's SQLite index, which counts towards usage too
+SLACK = MB // 2
+
+
+def _disk_bytes(root):
+    """Bytes under root, counting hard-linked files once."""
+    seen = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            st = os.stat(os.path.join(dirpath, name))
+            seen[(st.st_dev, st.st_ino)] = st.st_size
+    return sum(seen.values())
+
+
+def _download(directory, blobs, name, size=MB, age=0):
+    """A finished download the way fbdl.downloader leaves it: a name hard-linked into the blob store."""
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    then = time.time() - age
+    os.utime(path, (then, then))
+    if blobs:
+        blobs.adopt(path, hash_file(path))
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+    blobs = BlobStore(downloads / ".blobs")
+    storage = StorageManager(downloads, max_bytes=3 * MB + SLACK, min_age=0, link_dirs=[blobs.root])
+    return str(downloads), blobs, storage
+
+
+def test_usage_matches_disk_with_blobs(store):
+    downloads, blobs, storage = store
+    _download(downloads, blobs, "a.mp4")
+    _download(downloads, blobs, "b.mp4")
+    storage.ensure_headroom(0)
+    assert storage.usage()["bytes"] == _disk_bytes(downloads)
+    assert 2 * MB <= storage.usage()["bytes"] < 2 * MB + SLACK
+
+
+def test_eviction_removes_the_blob_behind_the_last_name(store):
+    downloads, blobs, storage = store
+    for i, name in enumerate(("a.mp4", "b.mp4", "c.mp4")):
+        _download(downloads, blobs, name, age=100 - i)
+
+    storage.ensure_headroom(2 * MB)
+
+    assert sorted(os.listdir(downloads)) == [".blobs", "c.mp4"]
+    assert blobs.stats()["blobs"] == 1
+    # The space really is free: what usage reports is what is on disk
+    assert storage.usage()["bytes"] == _disk_bytes(downloads) < MB + SLACK
+
+
+def test_shared_blob_goes_with_its_last_name(store):
+    downloads, blobs, storage = store
+    first = _download(downloads, blobs, "first.mp4", age=100)
+    second = os.path.join(downloads, "second.mp4")
+    with open(first, "rb") as src, open(second, "wb") as dst:
+        dst.write(src.read())
+    blobs.adopt(second, hash_file(second))
+
+    os.remove(second)
+    storage.ensure_headroom(0)
+    assert blobs.stats()["blobs"] == 1
+
+    # Asking for the whole budget evicts the remaining name, and its blob with it
+    storage.ensure_headroom(3 * MB)
+    assert blobs.stats()["blobs"] == 0
+    # Only the index is left; its WAL files may change size between scans
+    assert _disk_bytes(downloads) < SLACK
+    assert storage.usage()["bytes"] < SLACK
+
+
+def test_orphaned_blobs_count_until_gc(store):
+    downloads, blobs, storage = store
+    path = _download(downloads, blobs, "a.mp4")
+    digest = hash_file(path)
+    os.remove(path)
+    storage.ensure_headroom(0)
+    assert storage.usage()["bytes"] >= MB
+
+    assert blobs.gc() == 1
+    assert blobs.names(digest) == []
+    storage.ensure_headroom(0)
+    assert storage.usage()["bytes"] < SLACK
+
+
+def test_gc_keeps_a_blob_that_is_waiting_for_relink(store):
+    downloads, blobs, _ = store
+    path = _download(downloads, blobs, "a.mp4")
+    digest = hash_file(path)
+    # What faststart does: the blob is replaced by a new inode until relink() runs
+    blob = blobs.blob_path(digest)
+    with open(blob, "rb") as src, open(blob + ".new", "wb") as dst:
+        dst.write(src.read())
+    os.replace(blob + ".new", blob)
+    assert os.stat(blob).st_nlink == 1
+
+    assert blobs.gc() == 0
+    assert blobs.relink(digest) == 1
+    assert os.path.samefile(blob, path)
+
+
+def test_download_larger_than_the_budget(tmp_path):
+    storage = StorageManager(tmp_path, max_bytes=MB)
+    with pytest.raises(TooLarge):
+        storage.ensure_headroom(2 * MB)
+
+
+def test_young_files_are_never_evicted(tmp_path):
+    storage = StorageManager(tmp_path, max_bytes=MB, min_age=3600)
+    _download(str(tmp_path), None, "a.mp4")
+    with pytest.raises(StorageFull):
+        storage.ensure_headroom(MB // 2)
+    assert os.listdir(tmp_path) == ["a.mp4"]
@@ -0,0 +1,77 @@
+import pytest
+
+from fbdl.urls import cache_key, canonical_url, ingest_urls, video_key
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.facebook.com/reel/123",
+    "https://m.facebook.com/reel/123?mibextid=abc",
+    "https://web.facebook.com/reel/123/",
+    "facebook.com/reel/123",
+    "HTTP://WEB.Facebook.COM/REEL/123/",
+    "https://www.facebook.com/somepage/videos/123/",
+    "https://www.facebook.com/watch/?v=123",
+    "https://m.facebook.com/watch?v=123&ref=sharing",
+    "https://www.facebook.com/watch/?ref=sharing&v=123#comments",
+])
+def test_spellings_of_one_video_share_a_key(url):
+    assert video_key(url) == ("video", "123")
+    assert cache_key(url) == "video:123"
+
+
+def test_canonical_url_folds_hosts_and_trailing_slashes():
+    assert canonical_url("http://M.Facebook.com/reel/123/") == "https://www.facebook.com/reel/123"
+    assert canonical_url("web.facebook.com/watch/?v=123") == "https://www.facebook.com/watch?v=123"
+    # Other hosts are only lowercased
+    assert canonical_url("https://FB.WATCH/AbC/") == "https://fb.watch/AbC"
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.facebook.com/story.php?story_fbid=55&id=9",
+    "https://m.facebook.com/story.php?id=9&story_fbid=55",
+    "https://www.facebook.com/story.php?id=9&story_fbid=55&mibextid=x",
+])
+def test_story_posts_key_on_story_fbid_in_either_order(url):
+    assert video_key(url) == ("story", "55")
+
+
+def test_opaque_tokens_keep_their_case():
+    assert video_key("https://www.facebook.com/share/r/AbC_d-1/") == ("share", "AbC_d-1")
+    assert video_key("https://m.facebook.com/share/r/abc_d-1") == ("share", "abc_d-1")
+    assert video_key("https://FB.WATCH/AbCd/") == ("short", "AbCd")
+    assert video_key("https://fb.me/AbCd") == ("short", "AbCd")
+    assert cache_key("https://fb.watch/AbCd") != cache_key("https://fb.watch/abcd")
+
+
+def test_unrecognized_urls_fall_back_to_the_canonical_url():
+    assert video_key("https://www.facebook.com/groups/1/permalink/2/") is None
+    assert cache_key("https://m.facebook.com/groups/1/permalink/2/?ref=x") == \
+        "https://www.facebook.com/groups/1/permalink/2"
+
+
+def test_ingest_accepts_canonical_urls_in_order():
+    result = ingest_urls("https://m.facebook.com/reel/1?mibextid=x\n\n  https://fb.watch/AbC/  \n")
+    assert result.accepted == ["https://www.facebook.com/reel/1", "https://fb.watch/AbC"]
+    assert result.rejected == []
+
+
+def test_ingest_rejects_a_bad_line_once():
+    result = ingest_urls(["not a url\n", "https://www.facebook.com/reel/1\n"])
+    assert result.accepted == ["https://www.facebook.com/reel/1"]
+    assert result.rejected == [("not a url", "invalid")]
+
+
+def test_ingest_splits_lines_holding_several_urls():
+    result = ingest_urls("https://www.facebook.com/reel/1 https://example.com/x https://www.facebook.com/reel/2")
+    assert result.accepted == ["https://www.facebook.com/reel/1", "https://www.facebook.com/reel/2"]
+    assert result.rejected == [("https://example.com/x", "invalid")]
+
+
+def test_ingest_reports_duplicates_by_video_key():
+    result = ingest_urls(
+        "https://www.facebook.com/reel/1\nhttps://m.facebook.com/watch/?v=1\nhttps://www.facebook.com/reel/2",
+        existing=["https://web.facebook.com/reel/2/", " "],
+    )
+    assert result.accepted == ["https://www.facebook.com/reel/1"]
+    assert result.rejected == [("https://m.facebook.com/watch/?v=1", "duplicate"),
+                               ("https://www.facebook.com/reel/2", "duplicate")]
@@ -0,0 +1,76 @@
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+from fbdl.ydl_pool import YDLPool
+
+OPTS = {"quiet": True, "format": "best"}
+
+
+def test_back_to_back_leases_reuse_one_instance():
+    pool = YDLPool()
+    seen = []
+    for _ in range(3):
+        with pool.lease(OPTS) as ydl:
+            seen.append(ydl)
+    assert pool.stats() == {"idle": 1, "created": 1, "reused": 2}
+    assert seen[0] is seen[1] is seen[2]
+    pool.close()
+
+
+def test_options_select_separate_instances():
+    pool = YDLPool()
+    with pool.lease(OPTS) as first:
+        pass
+    with pool.lease({**OPTS, "format": "worst"}) as second:
+        pass
+    assert first is not second
+    assert pool.stats()["created"] == 2
+    pool.close()
+
+
+def test_concurrent_leases_get_their_own_instance():
+    pool = YDLPool()
+    with pool.lease(OPTS) as first, pool.lease(OPTS) as second:
+        assert first is not second
+    assert pool.stats()["idle"] == 2
+    pool.close()
+
+
+def test_failed_lease_is_not_reused():
+    pool = YDLPool()
+    with pytest.raises(RuntimeError):
+        with pool.lease(OPTS) as broken:
+            raise RuntimeError("extractor blew up")
+    with pool.lease(OPTS) as fresh:
+        assert fresh is not broken
+    pool.close()
+
+
+def test_instances_are_recycled_after_max_uses_and_idle_timeout():
+    pool = YDLPool(max_uses=2)
+    with pool.lease(OPTS) as first:
+        pass
+    with pool.lease(OPTS):
+        pass
+    with pool.lease(OPTS) as third:
+        assert third is not first
+
+    idle = YDLPool(idle_timeout=0)
+    with idle.lease(OPTS):
+        pass
+    idle.reap()
+    assert idle.stats()["idle"] == 0
+    pool.close()
+
+
+def test_progress_hook_follows_the_lease():
+    pool = YDLPool()
+    calls = []
+    with pool.lease(OPTS, calls.append) as ydl:
+        for hook in ydl.params["progress_hooks"]:
+            hook({"status": "downloading"})
+    for hook in ydl.params["progress_hooks"]:
+        hook({"status": "finished"})
+    assert calls == [{"status": "downloading"}]
+    pool.close()
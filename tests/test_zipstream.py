@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+import zipfile
+
+import pytest
+
+from fbdl import zipstream
+from fbdl.zipstream import BundleRegistry, IncrementalZip
+
+
+def _files(tmp_path, *names, size=4096):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(os.urandom(size) if name.endswith(".mp4") else name.encode() * 100)
+        paths.append(str(path))
+    return paths
+
+
+def _contents(zip_path):
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+def test_stores_media_and_renames_clashes(tmp_path):
+    a, b, notes = _files(tmp_path, "a/clip.mp4", "b/clip.mp4", "notes.txt")
+    bundle = IncrementalZip(str(tmp_path / "bundle.zip"))
+    for path in (a, b, a, notes):
+        bundle.append(path)
+    with zipfile.ZipFile(bundle.path) as zf:
+        assert zf.namelist() == ["clip.mp4", "clip (1).mp4", "notes.txt"]
+        assert [i.compress_type for i in zf.infolist()] == [zipfile.ZIP_STORED] * 2 + [zipfile.ZIP_DEFLATED]
+
+
+def test_append_never_rewrites_earlier_entries(tmp_path):
+    a, b = _files(tmp_path, "a.mp4", "b.mp4")
+    bundle = IncrementalZip(str(tmp_path / "bundle.zip"))
+    assert bundle.append(a)
+    with open(bundle.path, "rb") as f:
+        first_entry = f.read(4096)
+    assert bundle.append(b)
+    assert not bundle.append(a)
+    with open(bundle.path, "rb") as f:
+        assert f.read(4096) == first_entry
+    assert list(_contents(bundle.path)) == ["a.mp4", "b.mp4"]
+
+
+def test_remove_then_append(tmp_path):
+    a, b, c = _files(tmp_path, "x/a.mp4", "y/a.mp4", "c.txt")
+    bundle = IncrementalZip(str(tmp_path / "bundle.zip"))
+    bundle.append(a)
+    bundle.append(b)
+    size = os.path.getsize(bundle.path)
+
+    assert bundle.remove(a)
+    assert not bundle.remove(a)
+    # Only a new directory was appended; nothing before it moved
+    assert os.path.getsize(bundle.path) > size
+    assert list(_contents(bundle.path)) == ["a (1).mp4"]
+
+    bundle.append(c)
+    bundle.append(a)
+    contents = _contents(bundle.path)
+    assert list(contents) == ["a (1).mp4", "c.txt", "a.mp4"]
+    assert contents["a.mp4"] == open(a, "rb").read()
+
+
+def test_remove_writes_zip64_records_when_needed(tmp_path, monkeypatch):
+    paths = _files(tmp_path, "a.mp4", "b.mp4", "c.mp4")
+    bundle = IncrementalZip(str(tmp_path / "bundle.zip"))
+    for path in paths:
+        bundle.append(path)
+    # Pretend every offset and size is past the 32-bit limits
+    monkeypatch.setattr(zipstream, "ZIP64_LIMIT", 100)
+    monkeypatch.setattr(zipstream, "ZIP_FILECOUNT_LIMIT", 1)
+    bundle.remove(paths[1])
+    assert list(_contents(bundle.path)) == ["a.mp4", "c.mp4"]
+
+    monkeypatch.undo()
+    bundle.append(paths[1])
+    assert list(_contents(bundle.path)) == ["a.mp4", "c.mp4", "b.mp4"]
+
+
+def test_sync_and_reload(tmp_path):
+    a, b, c = _files(tmp_path, "a.mp4", "b.mp4", "c.mp4")
+    path = str(tmp_path / "bundle.zip")
+    bundle = IncrementalZip(path)
+    bundle.append(a)
+    bundle.append(b)
+
+    restored = IncrementalZip(path)
+    assert restored.paths() == [a, b]
+    assert restored.sync([b, c, str(tmp_path / "missing.mp4")])
+    assert sorted(restored.paths()) == [b, c]
+    assert sorted(_contents(path)) == ["b.mp4", "c.mp4"]
+    assert not restored.sync([b, c])
+
+
+def test_evicted_archive_starts_over(tmp_path):
+    a, b = _files(tmp_path, "a.mp4", "b.mp4")
+    bundle = IncrementalZip(str(tmp_path / "bundle.zip"))
+    bundle.append(a)
+    os.remove(bundle.path)
+    bundle.append(b)
+    assert bundle.paths() == [b]
+    assert list(_contents(bundle.path)) == ["b.mp4"]
+
+
+def test_discard_stops_late_appends(tmp_path):
+    a, = _files(tmp_path, "a.mp4")
+    bundle = IncrementalZip(str(tmp_path / "bundle.zip"))
+    bundle.append(a)
+    bundle.discard()
+    assert not bundle.append(a)
+    assert not os.path.exists(bundle.path)
+    assert not os.path.exists(f"{bundle.path}.json")
+
+
+def test_registry_shares_one_archive_per_name(tmp_path):
+    registry = BundleRegistry(tmp_path / "bundles")
+    bundle = registry.get("token123")
+    assert registry.get("token123") is bundle
+    with pytest.raises(ValueError):
+        registry.get("../escape")
+
+    registry.discard("token123")
+    assert registry.get("token123") is not bundle
+    registry.shutdown()
+
+
+def test_concurrent_appends_keep_archive_and_index_in_step(tmp_path):
+    registry = BundleRegistry(tmp_path / "bundles", max_workers=4)
+    paths = _files(tmp_path, *(f"v{i}.mp4" for i in range(20)))
+    # A refreshed tab and the old page's jobs both append to the same token's archive
+    barrier = threading.Barrier(2)
+
+    def old_page(chunk):
+        bundle = registry.get("tok")
+        barrier.wait()
+        for path in chunk:
+            registry.append_later(bundle, path)
+
+    threads = [threading.Thread(target=old_page, args=(paths[i::2],)) for i in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    registry.shutdown()
+
+    bundle = registry.get("tok")
+    assert sorted(_contents(bundle.path)) == sorted(os.path.basename(p) for p in paths)
+    with open(f"{bundle.path}.json", encoding="utf-8") as f:
+        assert sorted(json.load(f)) == sorted(paths)
+
+
+def test_append_after_offer_leaves_open_readers_a_valid_archive(tmp_path):
+    a, b, c = _files(tmp_path, "a.mp4", "b.mp4", "c.mp4")
+    bundle = IncrementalZip(str(tmp_path / "bundle.zip"))
+    bundle.append(a)
+    bundle.mark_offered()
+    with open(bundle.path, "rb") as reader:
+        before = open(bundle.path, "rb").read()
+        bundle.append(b)
+        # The download in progress still reads the archive it started with
+        assert reader.read() == before
+    assert list(_contents(bundle.path)) == ["a.mp4", "b.mp4"]
+    assert not os.path.exists(f"{bundle.path}.tmp")
+
+    # Until it is offered again, appends go straight into the new file
+    inode = os.stat(bundle.path).st_ino
+    bundle.append(c)
+    assert os.stat(bundle.path).st_ino == inode
+
+
+def test_remove_only_writes_past_the_end(tmp_path):
+    a, b = _files(tmp_path, "a.mp4", "b.mp4")
+    bundle = IncrementalZip(str(tmp_path / "bundle.zip"))
+    bundle.append(a)
+    bundle.append(b)
+    before = open(bundle.path, "rb").read()
+    bundle.remove(a)
+    assert open(bundle.path, "rb").read()[:len(before)] == before
+
+
+def test_registry_counts_pending_work(tmp_path):
+    registry = BundleRegistry(tmp_path / "bundles")
+    bundle = registry.get("tok")
+    release = threading.Event()
+    registry._executor.submit(release.wait)  # keep the single worker busy
+    paths = _files(tmp_path, "a.mp4", "b.mp4")
+    registry.append_later(bundle, paths[0])
+    registry.sync_later(bundle, paths)
+    assert registry.pending(bundle) == 2
+    release.set()
+    registry.shutdown()
+    assert registry.pending(bundle) == 0
+    assert sorted(_contents(bundle.path)) == ["a.mp4", "b.mp4"]